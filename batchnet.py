@@ -0,0 +1,164 @@
+import neat
+import numpy as np
+
+
+def _clamp(z, low=-60.0, high=60.0):
+    return np.minimum(np.maximum(z, low), high)
+
+
+def _inv(z):
+    out = np.zeros_like(z)
+    nonzero = z != 0
+    out[nonzero] = 1.0 / z[nonzero]
+    return out
+
+
+# NumPy versions of neat's built-in activation functions, keyed by the
+# function object neat hands out, so a custom function that reuses a
+# built-in name is never mistaken for it
+ACTIVATIONS = {
+    "sigmoid": lambda z: 1.0 / (1.0 + np.exp(-_clamp(5.0 * z))),
+    "tanh": lambda z: np.tanh(_clamp(2.5 * z)),
+    "sin": lambda z: np.sin(_clamp(5.0 * z)),
+    "gauss": lambda z: np.exp(-5.0 * _clamp(z, -3.4, 3.4) ** 2),
+    "relu": lambda z: np.where(z > 0.0, z, 0.0),
+    "softplus": lambda z: 0.2 * np.log(1 + np.exp(_clamp(5.0 * z))),
+    "identity": lambda z: z,
+    "clamped": lambda z: _clamp(z, -1.0, 1.0),
+    "inv": _inv,
+    "log": lambda z: np.log(np.maximum(z, 1e-7)),
+    "exp": lambda z: np.exp(_clamp(z)),
+    "abs": np.abs,
+    "hat": lambda z: np.maximum(0.0, 1 - np.abs(z)),
+    "square": lambda z: z ** 2,
+    "cube": lambda z: z ** 3,
+}
+ACTIVATIONS = {getattr(neat.activations, name + "_activation"): function
+               for name, function in ACTIVATIONS.items()
+               if hasattr(neat.activations, name + "_activation")}
+
+AGGREGATIONS = {getattr(neat.aggregations, name + "_aggregation"): name
+                for name in ("sum", "product", "max", "min", "mean")
+                if hasattr(neat.aggregations, name + "_aggregation")}
+
+
+class BatchNetwork:
+    # All the feed-forward networks of a population compiled into flat NumPy
+    # arrays, so one call evaluates every blob's net.
+    #
+    # Every node of every net gets a slot in one long state vector (the
+    # inputs of blob i first, at i * num_inputs). Nodes are grouped by
+    # depth: a node only reads inputs and shallower nodes, so each depth is
+    # a gather, a weighted bincount (which adds the links in the same order
+    # as neat's sum()) and one activation call per function.
+    #
+    # Nets using an activation or aggregation with no NumPy version here
+    # fall back to net.activate().
+    def __init__(self, nets):
+        self.nets = nets
+        self.num_nets = len(nets)
+        self.num_inputs = len(nets[0].input_nodes) if nets else 0
+        self.num_outputs = len(nets[0].output_nodes) if nets else 0
+        self.fallback = [i for i, net in enumerate(nets) if not self.supported(net)]
+        # uses_input[i, n]: net i reads its n-th input at all
+        self.uses_input = np.zeros((self.num_nets, self.num_inputs), dtype=bool)
+        for i, net in enumerate(nets):
+            read = self.inputs_read(net)
+            self.uses_input[i] = [key in read for key in net.input_nodes]
+
+        # Last slot is a constant 0.0 for outputs that nothing connects to
+        size = self.num_nets * self.num_inputs
+        self.output_slots = np.zeros((self.num_nets, self.num_outputs), dtype=int)
+        layers = {}
+        for i, net in enumerate(nets):
+            if i in self.fallback:
+                continue
+            slot = {key: i * self.num_inputs + n for n, key in enumerate(net.input_nodes)}
+            depth = {key: 0 for key in net.input_nodes}
+            for node, act_func, agg_func, bias, response, links in net.node_evals:
+                slot[node] = size
+                size += 1
+                depth[node] = 1 + max((depth[inode] for inode, weight in links), default=0)
+                layers.setdefault(depth[node], []).append(
+                    (slot[node], act_func, AGGREGATIONS[agg_func], bias, response,
+                     [(slot[inode], weight) for inode, weight in links]))
+            for n, key in enumerate(net.output_nodes):
+                self.output_slots[i, n] = slot.get(key, -1)
+        self.output_slots[self.output_slots < 0] = size
+        self.state = np.zeros(size + 1)
+        self.layers = [self.compile_layer(layers[depth]) for depth in sorted(layers)]
+
+    @staticmethod
+    def inputs_read(net):
+        return set(inode for node, act_func, agg_func, bias, response, links in net.node_evals
+                   for inode, weight in links)
+
+    @staticmethod
+    def supported(net):
+        return all(act_func in ACTIVATIONS and agg_func in AGGREGATIONS
+                   for node, act_func, agg_func, bias, response, links in net.node_evals)
+
+    @staticmethod
+    def compile_layer(nodes):
+        slots = np.array([node[0] for node in nodes])
+        bias = np.array([node[3] for node in nodes])
+        response = np.array([node[4] for node in nodes])
+        link_node = np.array([n for n, node in enumerate(nodes) for link in node[5]], dtype=int)
+        link_src = np.array([slot for node in nodes for slot, weight in node[5]], dtype=int)
+        link_weight = np.array([weight for node in nodes for slot, weight in node[5]], dtype=float)
+        num_links = np.bincount(link_node, minlength=len(nodes))
+
+        aggregations = {}
+        for n, node in enumerate(nodes):
+            aggregations.setdefault(node[2], []).append(n)
+        activations = {}
+        for n, node in enumerate(nodes):
+            activations.setdefault(node[1], []).append(n)
+        return (slots, bias, response, link_node, link_src, link_weight, num_links,
+                [(name, np.array(members)) for name, members in aggregations.items()],
+                [(ACTIVATIONS[func], np.array(members)) for func, members in activations.items()])
+
+    @staticmethod
+    def aggregate(name, link_node, values, num_links, size):
+        if name == "sum":
+            return np.bincount(link_node, weights=values, minlength=size)
+        if name == "mean":
+            total = np.bincount(link_node, weights=values, minlength=size)
+            return total / np.maximum(num_links, 1)
+        if name == "product":
+            out = np.ones(size)
+            np.multiply.at(out, link_node, values)
+            return out
+        out = np.full(size, -np.inf if name == "max" else np.inf)
+        (np.maximum if name == "max" else np.minimum).at(out, link_node, values)
+        out[num_links == 0] = 0.0
+        return out
+
+    def activate(self, inputs):
+        # inputs is (num_nets, num_inputs); returns (num_nets, num_outputs)
+        if inputs.shape != (self.num_nets, self.num_inputs):
+            raise RuntimeError("Expected inputs of shape {0}, got {1}".format(
+                (self.num_nets, self.num_inputs), inputs.shape))
+        state = self.state
+        state[:inputs.size] = inputs.ravel()
+        for (slots, bias, response, link_node, link_src, link_weight, num_links,
+             aggregations, activations) in self.layers:
+            values = state[link_src] * link_weight
+            if len(aggregations) == 1:
+                aggregated = self.aggregate(aggregations[0][0], link_node, values, num_links, len(slots))
+            else:
+                aggregated = np.zeros(len(slots))
+                for name, members in aggregations:
+                    aggregated[members] = self.aggregate(name, link_node, values, num_links,
+                                                         len(slots))[members]
+            z = bias + response * aggregated
+            if len(activations) == 1:
+                state[slots] = activations[0][0](z)
+            else:
+                for function, members in activations:
+                    state[slots[members]] = function(z[members])
+
+        output = state[self.output_slots]
+        for i in self.fallback:
+            output[i] = self.nets[i].activate(inputs[i].tolist())
+        return output
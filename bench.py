@@ -0,0 +1,209 @@
+import argparse
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+import neat
+import numpy as np
+
+from profiler import PHASES, PhaseProfiler
+
+
+# Throughput benchmark: runs one world per scenario (a fixed seed, a number of
+# blobs, food items, ticks and genome complexity) and reports ticks/sec, what
+# each phase of the tick cost and the peak memory. Every scenario runs in a
+# fresh process so the peak memory is its own.
+#
+# Results are appended to a JSON lines file, one record per scenario, so runs
+# from different commits (or machines) can be compared with --compare.
+#
+#   python bench.py --out before.jsonl
+#   python bench.py --out after.jsonl --compare before.jsonl
+#   SDL_VIDEODRIVER=dummy python bench.py --blobs 10 100 --render
+
+LOCAL_DIR = os.path.dirname(os.path.abspath(__file__))
+KEY = ("world", "mode", "blobs", "food", "ticks", "complexity", "arenas")
+
+
+def make_genomes(config, num_blobs, complexity, seed):
+    # complexity is the number of structural mutations (alternately a new
+    # node and a new connection) every genome gets on top of a fresh one
+    random.seed(seed)
+    genomes = []
+    for genome_id in range(num_blobs):
+        genome = config.genome_type(genome_id)
+        genome.configure_new(config.genome_config)
+        for n in range(complexity):
+            if n % 2:
+                genome.mutate_add_connection(config.genome_config)
+            else:
+                genome.mutate_add_node(config.genome_config)
+        genomes.append((genome_id, genome))
+    return genomes
+
+
+def run_scenario(scenario, config_path, seed):
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                config_path)
+    genomes = make_genomes(config, scenario["blobs"], scenario["complexity"], seed)
+
+    world_type = importlib.import_module(scenario["world"]).App
+    world = world_type(seed, arenas=scenario["arenas"])
+    world.ticks = scenario["ticks"]
+    world.num_food = scenario["food"]
+    if scenario["mode"] == "rendered":
+        from render import Renderer
+        renderer = Renderer()
+        world.attach(renderer)
+    profiler = PhaseProfiler()
+    world.attach(profiler)
+
+    started = time.perf_counter()
+    world.on_execute(genomes, config)
+    seconds = time.perf_counter() - started
+    if scenario["mode"] == "rendered":
+        renderer.close()
+
+    timing = profiler.last_world
+    result = dict(scenario)
+    result.update({
+        "seconds": seconds,
+        "ticks_per_second": timing["ticks"] / seconds,
+        "blob_ticks_per_second": timing["blob_ticks"] / seconds,
+        "phases": {phase: timing["phases"][phase] / timing["ticks"] for phase in PHASES
+                   if timing["phases"][phase]},
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss /
+                       (1024 * 1024 if sys.platform == "darwin" else 1024),
+        "nodes": float(np.mean([len(genome.nodes) for genome_id, genome in genomes])),
+        "connections": float(np.mean([sum(c.enabled for c in genome.connections.values())
+                                      for genome_id, genome in genomes])),
+    })
+    return result
+
+
+def run_isolated(scenario, config_path, seed, repeat):
+    # Best of `repeat` runs, each in a process of its own. Spawned rather
+    # than forked so the peak memory doesn't start at the parent's
+    context = multiprocessing.get_context("spawn")
+    best = None
+    for _ in range(repeat):
+        with context.Pool(1) as pool:
+            result = pool.apply(run_scenario, (scenario, config_path, seed))
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def machine():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=LOCAL_DIR,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "processor": platform.processor(),
+            "cpus": multiprocessing.cpu_count()}
+
+
+def load(path):
+    with open(path) as f:
+        results = [json.loads(line) for line in f if line.strip()]
+    for result in results:
+        # Results from before there were arenas
+        result.setdefault("arenas", 1)
+    return results
+
+
+def show(result, old=None):
+    phases = " ".join("{0} {1:.0f}us".format(phase, seconds * 1e6)
+                      for phase, seconds in result["phases"].items())
+    line = "{world:8} {mode:8} {blobs:5} blobs {food:6} food {ticks:6} ticks  cx {complexity:3}  " \
+           "x{arenas} {ticks_per_second:9.1f} ticks/s {blob_ticks_per_second:11.0f} blob-ticks/s " \
+           "{peak_rss_mb:7.1f} MB".format(**result)
+    if old is not None:
+        line += "  x{0:.2f}".format(result["ticks_per_second"] / old["ticks_per_second"])
+    print(line)
+    print("    " + phases)
+
+
+def show_scaling(title, results):
+    # For every parameter that was varied, ticks/sec along it with the
+    # others held at their first value
+    lines = []
+    for axis in ("blobs", "food", "complexity", "arenas"):
+        values = sorted(set(result[axis] for result in results))
+        if len(values) < 2:
+            continue
+        fixed = {key: results[0][key] for key in KEY if key != axis}
+        curve = [(result[axis], result["ticks_per_second"]) for result in results
+                 if all(result[key] == value for key, value in fixed.items())]
+        if len(curve) > 1:
+            lines.append("{0:>10}: {1}".format(axis, "  ".join("{0}: {1:.1f}".format(value, speed)
+                                                                for value, speed in sorted(curve))))
+    if lines:
+        print("\n" + title)
+        print("\n".join(lines))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation's tick throughput.")
+    parser.add_argument("--world", nargs="+", default=["explore"], metavar="MODULE",
+                        help="module(s) whose App is benchmarked (default explore)")
+    parser.add_argument("--blobs", type=int, nargs="+", default=[10, 100, 1000], metavar="N")
+    parser.add_argument("--food", type=int, nargs="+", default=[20, 1000, 10000], metavar="N")
+    parser.add_argument("--ticks", type=int, nargs="+", default=[1000], metavar="N")
+    parser.add_argument("--complexity", type=int, nargs="+", default=[0, 20], metavar="N",
+                        help="structural mutations added to every genome")
+    parser.add_argument("--arenas", type=int, nargs="+", default=[1], metavar="K",
+                        help="arenas per world (every genome gets a blob in each)")
+    parser.add_argument("--render", action="store_true",
+                        help="also run every scenario with a Renderer attached")
+    parser.add_argument("--repeat", type=int, default=1, metavar="N",
+                        help="keep the fastest of N runs of each scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--config", default=os.path.join(LOCAL_DIR, "config_feed_foward.txt"))
+    parser.add_argument("--label", help="stored with the results, to tell runs apart")
+    parser.add_argument("--out", metavar="FILE", help="append the results to FILE (JSON lines)")
+    parser.add_argument("--compare", metavar="FILE", help="show the speedup over the results in FILE")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    baseline = {}
+    if args.compare:
+        baseline = {tuple(old[key] for key in KEY): old for old in load(args.compare)}
+    modes = ["headless", "rendered"] if args.render else ["headless"]
+    info = machine()
+    info.update({"label": args.label, "seed": args.seed, "date": time.strftime("%Y-%m-%d %H:%M:%S")})
+
+    results = []
+    for world, mode, blobs, food, ticks, complexity, arenas in itertools.product(
+            args.world, modes, args.blobs, args.food, args.ticks, args.complexity, args.arenas):
+        scenario = {"world": world, "mode": mode, "blobs": blobs, "food": food, "ticks": ticks,
+                    "complexity": complexity, "arenas": arenas}
+        result = run_isolated(scenario, args.config, args.seed, args.repeat)
+        result.update(info)
+        results.append(result)
+        show(result, baseline.get(tuple(result[key] for key in KEY)))
+        if args.out:
+            with open(args.out, "a") as f:
+                f.write(json.dumps(result) + "\n")
+
+    for world, mode in itertools.product(args.world, modes):
+        show_scaling("Scaling ({0}, {1}), ticks/sec:".format(world, mode),
+                     [result for result in results if result["world"] == world and result["mode"] == mode])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import numpy as np
+
+
+# Set bits in each byte value
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+class BitRows:
+    # A (rows, columns) table of flags packed eight to a byte: column c of a
+    # row is bit c % 8 of byte c // 8. An eighth of the memory of a bool
+    # array, so a row per blob stays small with thousands of blobs and
+    # thousands of columns. Rows and columns are arrays of indices, like
+    # fancy indexing a bool array with table[rows, columns].
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.data = np.zeros((rows, (columns + 7) // 8), dtype=np.uint8)
+        # What a row with every column set looks like
+        self.full = np.packbits(np.ones(columns, dtype=bool), bitorder="little")
+
+    def get(self, rows, columns):
+        return ((self.data[rows, columns >> 3] >> (columns & 7)) & 1).astype(bool)
+
+    def set(self, rows, columns):
+        # ufunc.at, so several columns in the same byte of a row all stick
+        np.bitwise_or.at(self.data, (rows, columns >> 3), (1 << (columns & 7)).astype(np.uint8))
+
+    def clear_column(self, column, rows=slice(None)):
+        self.data[rows, column >> 3] &= np.uint8(~(1 << (column & 7)) & 0xff)
+
+    def column_all(self, columns, rows=slice(None)):
+        # Per column: set in every one of the rows
+        return (((self.data[rows][:, columns >> 3] >> (columns & 7)) & 1) == 1).all(axis=0)
+
+    def row_full(self, rows=slice(None)):
+        # Per row: every column set
+        return (self.data[rows] == self.full).all(axis=1)
+
+    def count(self):
+        # Set columns per row
+        return POPCOUNT[self.data].sum(axis=1, dtype=int)
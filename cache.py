@@ -0,0 +1,56 @@
+import collections
+import hashlib
+
+import neat
+
+
+def genome_hash(genome):
+    # Digest of everything about a genome that makes its network: every node
+    # and connection gene with all of its attributes, in key order
+    parts = []
+    for genes in (genome.nodes, genome.connections):
+        for key in sorted(genes):
+            gene = genes[key]
+            parts.append((key,) + tuple(getattr(gene, attribute.name) for attribute in gene._gene_attributes))
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).digest()
+
+
+class FitnessCache(neat.reporting.BaseReporter):
+    # Fitness of genomes already run, by (genome structure, world seed), so
+    # a genome that comes back unchanged (an elite, or a clone) in a world
+    # it has already been scored in is not run again. `context` stands for
+    # everything else the fitness depends on (the scenario). Keeps the
+    # `size` most recently used entries. Add it to the population as a
+    # reporter to get hit and miss counts every generation.
+    def __init__(self, size=10000, context=""):
+        self.size = size
+        self.context = context.encode()
+        self.entries = collections.OrderedDict()
+        self.hits = self.misses = 0
+        self.total_hits = self.total_misses = 0
+
+    def key(self, genome, seed):
+        return hashlib.blake2b(genome_hash(genome) + self.context + str(seed).encode(), digest_size=16).digest()
+
+    def get(self, key):
+        fitness = self.entries.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return fitness
+
+    def put(self, key, fitness):
+        self.entries[key] = fitness
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def post_evaluate(self, config, population, species, best_genome):
+        total = self.hits + self.misses
+        print("Fitness cache: {0} of {1} genomes cached ({2:.0f}%), {3} entries".format(
+            self.hits, total, 100.0 * self.hits / total if total else 0.0, len(self.entries)))
+        self.total_hits += self.hits
+        self.total_misses += self.misses
+        self.hits = self.misses = 0
@@ -0,0 +1,67 @@
+import gzip
+import itertools
+import pickle
+import random
+
+import neat
+
+
+class Checkpointer(neat.Checkpointer):
+    # neat's Checkpointer, plus what it leaves out and a resumed run needs
+    # to carry on exactly as if it had never stopped:
+    # - the run seed the world seeds are derived from,
+    # - the next genome id (neat starts counting from 1 again on restore,
+    #   and the new ids clash with the genomes carried over),
+    # - the best genome so far,
+    # - the generation number of the population being saved, which is the
+    #   *next* one to be evaluated.
+    def __init__(self, population, seed, generation_interval=5, time_interval_seconds=None,
+                 filename_prefix="neat-checkpoint-"):
+        super().__init__(generation_interval, time_interval_seconds, filename_prefix)
+        self.population = population
+        self.seed = seed
+        # A resumed run starts counting from the generation it resumed at
+        self.last_generation_checkpoint = population.generation - 1
+
+    def save_checkpoint(self, config, population, species_set, generation):
+        generation += 1
+        filename = "{0}{1}".format(self.filename_prefix, generation)
+        print("Saving checkpoint to {0}".format(filename))
+
+        reproduction = self.population.reproduction
+        next_genome_id = next(reproduction.genome_indexer)
+        reproduction.genome_indexer = itertools.count(next_genome_id)
+        data = {
+            "generation": generation,
+            "config": config,
+            "population": population,
+            "species_set": species_set,
+            "random_state": random.getstate(),
+            "seed": self.seed,
+            "next_genome_id": next_genome_id,
+            "ancestors": reproduction.ancestors,
+            "best_genome": self.population.best_genome,
+        }
+        # The species set holds on to the run's reporters, which can have
+        # files, sockets or worker pools open; the restored population gets
+        # its own
+        reporters, species_set.reporters = species_set.reporters, None
+        try:
+            with gzip.open(filename, "w", compresslevel=5) as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            species_set.reporters = reporters
+
+
+def restore_checkpoint(filename):
+    # Returns the population, ready to run the next generation, and the
+    # run seed
+    with gzip.open(filename) as f:
+        data = pickle.load(f)
+    random.setstate(data["random_state"])
+    p = neat.Population(data["config"], (data["population"], data["species_set"], data["generation"]))
+    p.species.reporters = p.reporters
+    p.reproduction.genome_indexer = itertools.count(data["next_genome_id"])
+    p.reproduction.ancestors = data["ancestors"]
+    p.best_genome = data["best_genome"]
+    return p, data["seed"]
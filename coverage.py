@@ -0,0 +1,102 @@
+import os
+
+import neat
+import numpy as np
+
+from bits import BitRows
+
+
+class CoverageGrid:
+    # Where the blobs of a world have been, on a cell_size grid over the
+    # arena (world.get_cell numbering; everywhere outside is one more cell,
+    # numbered rows * cols):
+    #
+    #   visited    BitRows (blobs, cells): blob i has been in cell c
+    #   counts     cells each blob has been in
+    #   visitors   per cell, how many blobs have been in it
+    #   ticks      per cell, blob-ticks spent in it (up to date after finish())
+    #
+    # Everything is allocated up front and updated for all blobs at once,
+    # and only blobs that changed cell are looked at, so a fine grid costs
+    # memory (a bit per blob and cell: 20 KB a blob for 10 px cells on a
+    # 4000 x 4000 map) but no time while blobs stay put.
+    def __init__(self, num_blobs, width, height, cell_size=50):
+        self.cell_size = cell_size
+        self.rows = -(-height // cell_size)
+        self.cols = -(-width // cell_size)
+        self.outside = self.rows * self.cols
+        self.visited = BitRows(num_blobs, self.outside + 1)
+        self.counts = np.zeros(num_blobs, dtype=int)
+        self.visitors = np.zeros(self.outside + 1, dtype=int)
+        self.ticks = np.zeros(self.outside + 1, dtype=np.int64)
+        self.cell = np.full(num_blobs, -1)
+        self.entered = np.zeros(num_blobs, dtype=np.int64)
+
+    def update(self, cell, tick):
+        # Blobs are in `cell` from `tick` on. Returns the blobs that got into
+        # a cell they had never been in
+        moved = (cell != self.cell).nonzero()[0]
+        if not len(moved):
+            return moved
+        self.leave(moved, tick)
+        cell = cell[moved]
+        self.cell[moved] = cell
+        self.entered[moved] = tick
+        new = ~self.visited.get(moved, cell)
+        moved, cell = moved[new], cell[new]
+        self.visited.set(moved, cell)
+        self.counts[moved] += 1
+        np.add.at(self.visitors, cell, 1)
+        return moved
+
+    def leave(self, blobs, tick):
+        # Book the time these blobs spent in their cell so far
+        old = self.cell[blobs]
+        inside = old >= 0
+        np.add.at(self.ticks, old[inside], tick - self.entered[blobs[inside]])
+        self.entered[blobs] = tick
+
+    def finish(self, tick):
+        self.leave(np.arange(len(self.cell)), tick)
+
+    def heatmap(self):
+        # (rows, cols): how many blobs have been in each cell
+        return self.visitors[:self.outside].reshape(self.rows, self.cols)
+
+    def time_map(self):
+        # (rows, cols): blob-ticks spent in each cell
+        return self.ticks[:self.outside].reshape(self.rows, self.cols)
+
+
+class HeatmapRecorder(neat.reporting.BaseReporter):
+    # Keeps a CoverageGrid for the worlds it is attached to and saves it to
+    # directory/gen-<G>.npz at the end of each world: heatmap and time_map
+    # (rows, cols), how many blobs and blob-ticks were outside, and the
+    # cells every genome got into, one row per arena. Add it to the
+    # population as a reporter too, so it knows the generation.
+    def __init__(self, directory, cell_size=50):
+        self.directory = directory
+        self.cell_size = cell_size
+        self.generation = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def on_init(self, world):
+        self.grid = CoverageGrid(world.num_blobs, world.width, world.height, self.cell_size)
+
+    def on_tick(self, world):
+        # Positions after the step that just ran
+        self.grid.update(world.get_cell(self.cell_size), world.tick - 1)
+
+    def on_cleanup(self, world):
+        grid = self.grid
+        grid.finish(world.tick)
+        name = "gen-{0:04d}.npz".format(self.generation) if self.generation is not None else "world.npz"
+        np.savez_compressed(os.path.join(self.directory, name), heatmap=grid.heatmap(),
+                            time_map=grid.time_map(), outside_visitors=grid.visitors[grid.outside],
+                            outside_ticks=grid.ticks[grid.outside], cell_size=grid.cell_size,
+                            counts=grid.counts.reshape(world.arenas, world.num_genomes),
+                            genome_ids=[genome_id for genome_id, genome in world.genomes])
+        self.grid = None
@@ -0,0 +1,361 @@
+import argparse
+import collections
+import importlib
+import io
+import multiprocessing
+import os
+import pickle
+import queue
+import selectors
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from evaluate import PoolEvaluator, _evaluate_shard, _init_worker
+
+
+# Evaluation on other machines. A DistributedEvaluator listens on a TCP port
+# and worker processes connect to it, from any number of nodes:
+#
+#   python main.py --distribute 0.0.0.0:8766            (the run)
+#   python distributed.py coordinator-host:8766 -n 8    (on every node)
+#
+# Messages are a 4 byte length and a pickled tuple:
+#
+#   coordinator -> worker
+#     ("setup", id, blob)            world type and NEAT config, when they change
+#     ("generation", g, blob)        every genome of generation g, once
+#     ("task", g, task, seed, ids, profile)
+#                                    run these genome ids in a world with seed
+#     ("stop",)
+#   worker -> coordinator
+#     ("result", g, task, fitness, timing)
+#
+# The blobs are pickled and compressed once and the same bytes go to every
+# worker, so a task itself is only a seed and a list of genome ids. Pickles
+# run code when loaded: only listen on networks you trust.
+LENGTH = struct.Struct(">I")
+
+
+def _main_class(module, name):
+    return getattr(importlib.import_module(module), name)
+
+
+class _Pickler(pickle.Pickler):
+    # Classes defined in the script that was started (main.App when running
+    # python main.py) live in __main__, which on a worker is this file. Send
+    # them by the script's module name instead
+    def reducer_override(self, obj):
+        if isinstance(obj, type) and obj.__module__ == "__main__":
+            module = os.path.splitext(os.path.basename(sys.modules["__main__"].__file__))[0]
+            return _main_class, (module, obj.__qualname__)
+        return NotImplemented
+
+
+def pack(obj):
+    f = io.BytesIO()
+    _Pickler(f, pickle.HIGHEST_PROTOCOL).dump(obj)
+    return zlib.compress(f.getvalue(), 1)
+
+
+def unpack(blob):
+    return pickle.loads(zlib.decompress(blob))
+
+
+def send(sock, message):
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(LENGTH.pack(len(data)) + data)
+
+
+def receive(sock):
+    # Next message off a blocking socket, None once it is closed
+    header = _read(sock, LENGTH.size)
+    if header is None:
+        return None
+    data = _read(sock, LENGTH.unpack(header)[0])
+    return pickle.loads(data) if data is not None else None
+
+
+def _read(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def parse_address(text, host="localhost"):
+    # "[HOST:]PORT" -> (host, port)
+    name, _, port = text.rpartition(":")
+    return name or host, int(port)
+
+
+class _Remote:
+    # The coordinator's side of one connected worker
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.name = "{0}:{1}".format(*address[:2])
+        self.buffer = bytearray()
+        self.setup = None
+        self.generation = None
+        self.task = None
+        self.started = 0.0
+
+    def messages(self):
+        # Complete messages received so far
+        while len(self.buffer) >= LENGTH.size:
+            size = LENGTH.unpack_from(self.buffer)[0]
+            if len(self.buffer) < LENGTH.size + size:
+                return
+            data = bytes(self.buffer[LENGTH.size:LENGTH.size + size])
+            del self.buffer[:LENGTH.size + size]
+            yield pickle.loads(data)
+
+
+class DistributedEvaluator(PoolEvaluator):
+    # Evaluates a generation on whatever workers are connected, splitting it
+    # into shards the same way PoolEvaluator does (shared or isolated
+    # worlds, same seeds, so the same fitness). Use evaluator.evaluate as the
+    # fitness function and add the evaluator as a reporter.
+    #
+    # Every worker gets `batches` shards at a time on average, one at a
+    # time. A shard whose worker goes away, or takes longer than `timeout`
+    # seconds (the worker is then dropped), goes back in the queue; one that
+    # fails `retries` times ends the run, and so does having no workers left
+    # when all of them were local. Workers can come and go between and
+    # during generations, and dropped ones connect again. local_workers
+    # starts that many workers on this machine, standing in for nodes.
+    def __init__(self, world_type, address=("localhost", 8766), mode="shared", seed=None, profiler=None,
+                 fixed=False, cache=None, local_workers=0, batches=4, timeout=None, retries=3):
+        super().__init__(world_type, 1, mode, seed, profiler, fixed, cache)
+        self.batches = batches
+        self.timeout = timeout
+        self.retries = retries
+        self.listener = socket.create_server(address)
+        self.listener.setblocking(False)
+        self.address = self.listener.getsockname()[:2]
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.remotes = {}
+        self.setup = None
+        self.setup_id = 0
+        self.local = [multiprocessing.Process(target=work, args=(self.address,), daemon=True)
+                      for _ in range(local_workers)]
+        for process in self.local:
+            process.start()
+
+    def accept(self):
+        sock, address = self.listener.accept()
+        sock.settimeout(30)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        remote = self.remotes[sock] = _Remote(sock, address)
+        self.selector.register(sock, selectors.EVENT_READ, remote)
+        print("Worker {0} joined ({1} connected)".format(remote.name, len(self.remotes)))
+
+    def drop(self, remote, reason):
+        self.selector.unregister(remote.sock)
+        remote.sock.close()
+        del self.remotes[remote.sock]
+        print("Worker {0} {1} ({2} connected)".format(remote.name, reason, len(self.remotes)))
+
+    def assign(self, remote, task, seed, ids, generation_blob):
+        # Whatever this worker hasn't got yet, then the task
+        if remote.setup != self.setup_id:
+            send(remote.sock, ("setup", self.setup_id, self.setup))
+            remote.setup = self.setup_id
+        if remote.generation != self.generation:
+            send(remote.sock, ("generation", self.generation, generation_blob))
+            remote.generation = self.generation
+        send(remote.sock, ("task", self.generation, task, seed, ids, self.profiler is not None))
+        remote.task = task
+        remote.started = time.monotonic()
+
+    def evaluate(self, genomes, config):
+        if self.pool_config is not config:
+            self.setup = pack((self.world_type, config))
+            self.setup_id += 1
+            self.pool_config = config
+        genomes = self.uncached(genomes)
+        generation_blob = pack(dict(genomes))
+
+        # Shard for the workers there are now; late joiners share the queue
+        self.num_workers = max(len(self.remotes), 1) * self.batches
+        tasks = {task: (seed, [genome_id for genome_id, genome in shard])
+                 for task, (seed, shard) in enumerate(self.shards(genomes))}
+        waiting = collections.deque(tasks)
+        failures = collections.Counter()
+        fitness = {}
+        done = set()
+        waited = False
+
+        def requeue(task, reason):
+            failures[task] += 1
+            if failures[task] > self.retries:
+                raise RuntimeError("shard {0} of generation {1} failed {2} times (last: {3})".format(
+                    task, self.generation, failures[task], reason))
+            waiting.appendleft(task)
+
+        while len(done) < len(tasks):
+            for remote in list(self.remotes.values()):
+                if not waiting:
+                    break
+                if remote.task is None:
+                    task = waiting.popleft()
+                    try:
+                        self.assign(remote, task, tasks[task][0], tasks[task][1], generation_blob)
+                    except OSError:
+                        self.drop(remote, "went away")
+                        requeue(task, "worker went away")
+            if not self.remotes:
+                # Local workers connect again after being dropped; with none
+                # of them left nothing will take the shards (nodes started by
+                # hand are waited for, as at the start of a run)
+                if self.local and not any(process.is_alive() for process in self.local):
+                    raise RuntimeError("no workers left for generation {0} ({1} shards waiting)".format(
+                        self.generation, len(waiting)))
+                if not waited:
+                    print("Waiting for workers on {0}:{1}".format(*self.address))
+                    waited = True
+
+            for key, events in self.selector.select(timeout=0.5):
+                if key.fileobj is self.listener:
+                    self.accept()
+                    continue
+                remote = key.data
+                try:
+                    data = remote.sock.recv(1 << 16)
+                except OSError:
+                    data = b""
+                if not data:
+                    task = remote.task
+                    self.drop(remote, "went away")
+                    if task is not None:
+                        requeue(task, "worker went away")
+                    continue
+                remote.buffer += data
+                for kind, generation, task, shard_fitness, timing in remote.messages():
+                    remote.task = None
+                    # Late answers to a shard that was handed out again
+                    if generation != self.generation or task in done:
+                        continue
+                    done.add(task)
+                    fitness.update(shard_fitness)
+                    if timing is not None:
+                        self.profiler.add(timing)
+
+            if self.timeout is not None:
+                now = time.monotonic()
+                for remote in list(self.remotes.values()):
+                    if remote.task is not None and now - remote.started > self.timeout:
+                        task = remote.task
+                        self.drop(remote, "timed out")
+                        requeue(task, "timed out")
+
+        for genome_id, genome in genomes:
+            genome.fitness = fitness[genome_id]
+        self.remember(fitness)
+
+    def close(self):
+        for remote in list(self.remotes.values()):
+            try:
+                send(remote.sock, ("stop",))
+            except OSError:
+                pass
+            self.selector.unregister(remote.sock)
+            remote.sock.close()
+        self.remotes = {}
+        # One that was connecting again missed the stop
+        for process in self.local:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        self.local = []
+        if self.listener is not None:
+            self.selector.unregister(self.listener)
+            self.listener.close()
+            self.listener = None
+
+    def __del__(self):
+        for process in getattr(self, "local", ()):
+            process.terminate()
+
+
+def work(address, retry=1.0):
+    # One worker: connects to a coordinator (trying again every `retry`
+    # seconds until one is listening) and runs shards until it is told to
+    # stop. A worker the coordinator drops (or loses) connects again
+    while not _session(address, retry):
+        pass
+
+
+def _session(address, retry):
+    # One connection; True once the coordinator says stop
+    while True:
+        try:
+            sock = socket.create_connection(address)
+            break
+        except OSError:
+            time.sleep(retry)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    # Reading on a thread of its own keeps the socket drained while a shard
+    # runs, so the coordinator never blocks sending to a busy worker
+    inbox = queue.Queue()
+
+    def read():
+        try:
+            while True:
+                message = receive(sock)
+                inbox.put(message)
+                if message is None:
+                    return
+        except OSError:
+            inbox.put(None)
+    threading.Thread(target=read, daemon=True).start()
+
+    world_type = None
+    genomes = {}
+    try:
+        while True:
+            message = inbox.get()
+            if message is None:
+                return False
+            if message[0] == "stop":
+                return True
+            if message[0] == "setup":
+                world_type, config = unpack(message[2])
+                _init_worker(config)
+            elif message[0] == "generation":
+                genomes = unpack(message[2])
+            elif message[0] == "task":
+                kind, generation, task, seed, ids, profile = message
+                fitness, timing = _evaluate_shard(world_type, seed, [(i, genomes[i]) for i in ids], profile)
+                send(sock, ("result", generation, task, fitness, timing))
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate genomes for a run started with --distribute.")
+    parser.add_argument("address", metavar="HOST:PORT", help="where the run is listening")
+    parser.add_argument("-n", "--processes", type=int, default=1, metavar="N",
+                        help="worker processes to start on this node (default 1)")
+    args = parser.parse_args()
+    address = parse_address(args.address)
+    processes = [multiprocessing.Process(target=work, args=(address,)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import multiprocessing
+import random
+
+import neat
+
+from profiler import PhaseProfiler
+
+
+def world_seed(seed, *keys):
+    # Stable per-(run, generation, ...) seed, the same in every process
+    return random.Random("-".join(str(k) for k in (seed,) + keys)).getrandbits(32)
+
+
+# Set once per worker by the pool initializer, instead of pickling the config
+# with every task
+_config = None
+
+
+def _init_worker(config):
+    global _config
+    _config = config
+
+
+def _evaluate_shard(world_type, seed, genomes, profile=False):
+    world = world_type(seed)
+    profiler = None
+    if profile:
+        profiler = PhaseProfiler()
+        world.attach(profiler)
+    world.on_execute(genomes, _config)
+    return ([(genome_id, genome.fitness) for genome_id, genome in genomes],
+            profiler.last_world if profiler else None)
+
+
+class SerialEvaluator(neat.reporting.BaseReporter):
+    # Evaluates a generation in this process, in one world seeded from the
+    # run seed and the generation (the same world PoolEvaluator's shared
+    # mode builds; fixed=True leaves the generation out, so every
+    # generation gets the same world). Observers are attached to every
+    # world it builds.
+    def __init__(self, world_type, seed=None, observers=(), fixed=False):
+        self.world_type = world_type
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.observers = list(observers)
+        self.fixed = fixed
+        self.generation = 0
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def evaluate(self, genomes, config):
+        world = self.world_type(world_seed(self.seed) if self.fixed else world_seed(self.seed, self.generation))
+        for observer in self.observers:
+            world.attach(observer)
+        world.on_execute(genomes, config)
+
+    def close(self):
+        pass
+
+
+class PoolEvaluator(neat.reporting.BaseReporter):
+    # Evaluates a generation across a pool of worker processes, each running
+    # its own headless world. Use evaluator.evaluate as the fitness function
+    # and add the evaluator as a reporter so it knows the generation.
+    #
+    # mode="shared": every worker builds the world the whole population
+    #   would have shared (same seed, same food layout) and runs its slice
+    #   of the genomes in it. Blobs only meet through the food and each blob
+    #   has its own eaten set, so without respawning this gives the same
+    #   fitness as one world. Worlds where blobs do affect each other
+    #   (world.interacting: they compete for food, food comes back once
+    #   every blob has eaten it, or a sensor such as neighbours reads the
+    #   other blobs) can't be split, and run whole in one worker.
+    # mode="isolated": every genome gets a world of its own, seeded from the
+    #   run seed, the generation and the genome id.
+    #
+    # fixed=True seeds worlds from the run seed alone, so every generation
+    # (and in isolated mode every genome) gets the same world. Given a
+    # FitnessCache, genomes whose fitness only depends on themselves and
+    # their world seed (isolated mode, or shared worlds that aren't
+    # interacting) are looked up first and only the rest run. So the cache
+    # pays off with fixed worlds: otherwise the seed changes every
+    # generation and only clones within a generation of a shared world can
+    # hit (in isolated mode the seed has the genome id too, so nothing does).
+    #
+    # Given a PhaseProfiler, the workers time their worlds and the profiler
+    # gets their numbers.
+    def __init__(self, world_type, num_workers=None, mode="shared", seed=None, profiler=None,
+                 fixed=False, cache=None):
+        if mode not in ("shared", "isolated"):
+            raise ValueError("mode must be 'shared' or 'isolated', not {!r}".format(mode))
+        self.world_type = world_type
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.mode = mode
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.profiler = profiler
+        self.fixed = fixed
+        self.cache = cache
+        self.generation = 0
+        self.interacting = world_type().interacting
+        self.keys = {}
+        self.pool = None
+        self.pool_config = None
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def world_seed(self, genome_id):
+        if self.fixed:
+            return world_seed(self.seed)
+        if self.mode == "isolated":
+            return world_seed(self.seed, self.generation, genome_id)
+        return world_seed(self.seed, self.generation)
+
+    def uncached(self, genomes):
+        # Genomes the cache has no fitness for; the others get theirs
+        self.keys = {}
+        if self.cache is None or self.interacting:
+            return genomes
+        left = []
+        for genome_id, genome in genomes:
+            key = self.cache.key(genome, self.world_seed(genome_id))
+            fitness = self.cache.get(key)
+            if fitness is None:
+                self.keys[genome_id] = key
+                left.append((genome_id, genome))
+            else:
+                genome.fitness = fitness
+        return left
+
+    def remember(self, fitness):
+        for genome_id, key in self.keys.items():
+            self.cache.put(key, fitness[genome_id])
+
+    def shards(self, genomes):
+        if self.mode == "isolated":
+            return [(self.world_seed(genome_id), [(genome_id, genome)]) for genome_id, genome in genomes]
+        seed = self.world_seed(None)
+        if not genomes:
+            return []
+        if self.interacting:
+            return [(seed, genomes)]
+        size = -(-len(genomes) // self.num_workers)
+        return [(seed, genomes[i:i + size]) for i in range(0, len(genomes), size)]
+
+    def evaluate(self, genomes, config):
+        if self.pool is None or self.pool_config is not config:
+            self.close()
+            self.pool = multiprocessing.Pool(self.num_workers, _init_worker, (config,))
+            self.pool_config = config
+
+        profile = self.profiler is not None
+        genomes = self.uncached(genomes)
+        jobs = [self.pool.apply_async(_evaluate_shard, (self.world_type, seed, shard, profile))
+                for seed, shard in self.shards(genomes)]
+        fitness = {}
+        for job in jobs:
+            shard_fitness, timing = job.get()
+            fitness.update(shard_fitness)
+            if timing is not None:
+                self.profiler.add(timing)
+        for genome_id, genome in genomes:
+            genome.fitness = fitness[genome_id]
+        self.remember(fitness)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __del__(self):
+        if self.pool is not None:
+            self.pool.terminate()
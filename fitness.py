@@ -0,0 +1,139 @@
+import numpy as np
+
+from bits import BitRows
+from coverage import CoverageGrid
+
+
+# Fitness components. A world adds up the fitness of its blobs from a list of
+# these; each one keeps whatever it tracks for all blobs at once and adds to
+# world.fitness (one entry per blob):
+#
+#   on_init(world)               after the blobs are set up
+#   on_tick(world)               every physics step, after the blobs moved
+#   on_eat(world, eaters, count) blobs `eaters` ate `count` items this step
+#   on_end(world)                once, before the fitness is handed to NEAT
+#
+# A world only pays for the trackers of the components it has.
+# scores_movement says whether a component rewards where blobs go (see
+# stopping.FoodGone), uses_region whether it reads world.region (which the
+# world only works out when something does).
+
+
+class Component:
+    scores_movement = False
+    uses_region = False
+
+    def on_init(self, world):
+        pass
+
+    def on_tick(self, world):
+        pass
+
+    def on_eat(self, world, eaters, count):
+        pass
+
+    def on_end(self, world):
+        pass
+
+
+class Food(Component):
+    # `weight` for every food item eaten
+    def __init__(self, weight=1.0):
+        self.weight = weight
+
+    def on_eat(self, world, eaters, count):
+        world.fitness[eaters] += self.weight * count
+
+
+class Regions(Component):
+    # `weight` for every region of the world's region grid a blob has been
+    # in (being outside the arena counts as a region too)
+    scores_movement = True
+    uses_region = True
+
+    def __init__(self, weight=1.0):
+        self.weight = weight
+
+    def on_init(self, world):
+        # Bit (i, r + 1): blob i has been in region r (-1 is outside). A
+        # blob right on the bottom or right edge is in row or column
+        # `regions`, one past the grid
+        self.been = BitRows(world.num_blobs, world.regions * (world.regions + 1) + 2)
+        self.rows = np.arange(world.num_blobs)
+
+    def on_tick(self, world):
+        self.been.set(self.rows, world.region + 1)
+
+    def on_end(self, world):
+        world.fitness += self.weight * self.been.count()
+
+
+class OutOfBounds(Component):
+    # -`penalty` for a blob that ever left the arena
+    scores_movement = True
+    uses_region = True
+
+    def __init__(self, penalty=5.0):
+        self.penalty = penalty
+
+    def on_init(self, world):
+        self.left = np.zeros(world.num_blobs, dtype=bool)
+
+    def on_tick(self, world):
+        self.left |= world.region < 0
+
+    def on_end(self, world):
+        world.fitness[self.left] -= self.penalty
+
+
+class Coverage(Component):
+    # `weight` for every new cell of a cell_size grid a blob gets into, paid
+    # as it gets there (everywhere outside the arena is one more cell)
+    scores_movement = True
+
+    def __init__(self, weight=0.1, cell_size=50):
+        self.weight = weight
+        self.cell_size = cell_size
+
+    def on_init(self, world):
+        # Also left on the world, for heatmaps and visit counts at the end
+        self.grid = world.coverage = CoverageGrid(world.num_blobs, world.width, world.height, self.cell_size)
+
+    def on_tick(self, world):
+        new = self.grid.update(world.get_cell(self.cell_size), world.tick)
+        world.fitness[new] += self.weight
+
+    def on_end(self, world):
+        self.grid.finish(world.tick)
+
+
+FITNESS_COMPONENTS = {
+    "food": Food,
+    "regions": Regions,
+    "out_of_bounds": OutOfBounds,
+    "coverage": Coverage,
+}
+
+
+def parse_fitness(spec):
+    # "food,coverage:0.2:25" -> [Food(), Coverage(0.2, 25)]: component names,
+    # each with an optional weight (the penalty for out_of_bounds), and for
+    # coverage after that an optional cell size in px
+    components = []
+    for part in spec.split(","):
+        name, _, rest = part.strip().partition(":")
+        if name not in FITNESS_COMPONENTS:
+            raise ValueError("unknown fitness component {!r} (known: {})".format(
+                name, ", ".join(sorted(FITNESS_COMPONENTS))))
+        values = rest.split(":") if rest else []
+        if len(values) > (2 if name == "coverage" else 1):
+            raise ValueError("fitness component {!r}: only coverage takes a cell size (coverage:WEIGHT:CELL)".format(
+                part.strip()))
+        args = [float(values[0])] if values else []
+        if len(values) == 2:
+            if not values[1].isdigit() or int(values[1]) < 1:
+                raise ValueError("fitness component {!r}: the cell size has to be a whole number of px".format(
+                    part.strip()))
+            args.append(int(values[1]))
+        components.append(FITNESS_COMPONENTS[name](*args))
+    return components
@@ -0,0 +1,93 @@
+import bisect
+import collections
+
+import numpy as np
+
+
+# Food policies decide where food goes (uniformly, or following a
+# DensityField) and what happens to it once it's used up: eaten by every blob
+# or, in a world that consumes food, eaten by anyone.
+# World.check_collision hands the used up ids to policy.used_up() and on_loop
+# calls policy.on_tick() once a tick.
+#
+# Food ids never change. An item that is gone is just taken out of the
+# world's FoodGrid (and food_active is False), so vision and collisions never
+# look at it again and the tick cost doesn't grow as food gets eaten.
+
+
+class DensityField:
+    # A 2D array of weights laid over the arena, row 0 at the top. Placing
+    # food picks a cell in proportion to its weight, then a point uniformly
+    # inside it.
+    def __init__(self, weights):
+        self.weights = np.asarray(weights, dtype=float)
+        if self.weights.ndim != 2 or (self.weights < 0).any() or not self.weights.sum() > 0:
+            raise ValueError("density field must be a 2D array of weights >= 0 with a positive sum")
+        self.cumulative = np.cumsum(self.weights.ravel()).tolist()
+
+    def place(self, world):
+        rows, cols = self.weights.shape
+        cell = bisect.bisect_right(self.cumulative, world.rng.random() * self.cumulative[-1])
+        row, col = divmod(min(cell, rows * cols - 1), cols)
+        food_w, food_h = world.food_size
+        cell_w = world.width / cols
+        cell_h = world.height / rows
+        food_x = int(world.rng.uniform(col * cell_w, (col + 1) * cell_w))
+        food_y = int(world.rng.uniform(row * cell_h, (row + 1) * cell_h))
+        return (min(food_x, world.width - food_w), min(food_y, world.height - food_h))
+
+
+class NoRespawn:
+    # Food is placed once and used up food is gone for good
+    static = True
+
+    def __init__(self, field=None):
+        self.field = field
+
+    def on_init(self, world):
+        pass
+
+    def place(self, world):
+        if self.field is not None:
+            return self.field.place(world)
+        return world.reset_food()
+
+    def used_up(self, world, food_ids):
+        for food_id in food_ids:
+            world.remove_food(food_id)
+
+    def on_tick(self, world):
+        pass
+
+
+class TimedRespawn(NoRespawn):
+    # Used up food comes back somewhere new `delay` ticks later
+    static = False
+
+    def __init__(self, delay, field=None):
+        super().__init__(field)
+        self.delay = delay
+
+    def on_init(self, world):
+        # (tick it comes back, food id), in tick order since the delay is fixed
+        self.pending = collections.deque()
+
+    def used_up(self, world, food_ids):
+        for food_id in food_ids:
+            if self.delay:
+                world.remove_food(food_id)
+                self.pending.append((world.tick + self.delay, food_id))
+            else:
+                world.respawn_food(food_id, self.place(world))
+
+    def on_tick(self, world):
+        while self.pending and self.pending[0][0] <= world.tick:
+            world.respawn_food(self.pending.popleft()[1], self.place(world))
+
+
+class ImmediateRespawn(TimedRespawn):
+    # Used up food comes back somewhere new straight away, so there is always
+    # the same amount of it
+    def __init__(self, field=None):
+        super().__init__(0, field)
+
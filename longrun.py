@@ -0,0 +1,103 @@
+import glob
+import json
+import os
+import pickle
+import statistics
+
+import neat
+
+
+# For runs of thousands of generations. neat.StatisticsReporter keeps every
+# generation's best genome and species fitness in memory, and NEAT itself
+# keeps every species' whole fitness history and the parents of every genome
+# ever made, so a long run grows until it is killed. StatsStream writes the
+# statistics out as the run goes instead and trims NEAT's own history, so
+# memory stays flat:
+#
+#   stats-<N>.jsonl   one JSON object per generation
+#   best-<N>.pkl      that generation's best genome, pickled one after another
+#
+# A new pair of files is started every `rotate` generations (N is the first
+# generation in it) and only the newest `keep` pairs are kept (all of them
+# with keep=None).
+
+
+class StatsStream(neat.reporting.BaseReporter):
+    def __init__(self, population, directory, rotate=100, keep=None):
+        self.population = population
+        self.directory = directory
+        self.rotate = rotate
+        self.keep = keep
+        self.generation = None
+        self.part = None
+        self.stats = self.best = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def open(self):
+        part = self.generation - self.generation % self.rotate
+        if part == self.part:
+            return
+        self.close()
+        self.part = part
+        self.stats = open(os.path.join(self.directory, "stats-{0:06d}.jsonl".format(part)), "a")
+        self.best = open(os.path.join(self.directory, "best-{0:06d}.pkl".format(part)), "ab")
+        if self.keep is not None:
+            for pattern in ("stats-*.jsonl", "best-*.pkl"):
+                for path in sorted(glob.glob(os.path.join(self.directory, pattern)))[:-self.keep]:
+                    os.remove(path)
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.open()
+        fitnesses = [genome.fitness for genome in population.values()]
+        record = {
+            "generation": self.generation,
+            "population": len(fitnesses),
+            "mean": statistics.mean(fitnesses),
+            "stdev": statistics.pstdev(fitnesses),
+            "best": {"id": best_genome.key, "fitness": best_genome.fitness, "size": list(best_genome.size())},
+            "species": {str(sid): {"size": len(s.members),
+                                   "fitness": max(m.fitness for m in s.members.values())}
+                        for sid, s in species.species.items()},
+        }
+        self.stats.write(json.dumps(record) + "\n")
+        self.stats.flush()
+        pickle.dump(best_genome, self.best)
+        self.best.flush()
+
+    def end_generation(self, config, population, species_set):
+        # Stagnation only ever looks at the best of a species' fitness
+        # history, and nothing reads the ancestry of genomes that are gone
+        for s in species_set.species.values():
+            if len(s.fitness_history) > 1:
+                s.fitness_history = [max(s.fitness_history)]
+        ancestors = self.population.reproduction.ancestors
+        self.population.reproduction.ancestors = {key: ancestors[key] for key in population if key in ancestors}
+
+    def close(self):
+        for f in (self.stats, self.best):
+            if f is not None:
+                f.close()
+        self.stats = self.best = None
+        self.part = None
+
+
+def read_stats(directory):
+    # Every generation's record still on disk, in order
+    for path in sorted(glob.glob(os.path.join(directory, "stats-*.jsonl"))):
+        with open(path) as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def read_best(directory):
+    # Every generation's best genome still on disk, in order
+    for path in sorted(glob.glob(os.path.join(directory, "best-*.pkl"))):
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    break
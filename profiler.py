@@ -0,0 +1,131 @@
+import json
+import time
+
+import neat
+import numpy as np
+
+
+# Phase name -> the method that gets timed for it. World methods first, then
+# observer methods (only timed on observers that have them)
+WORLD_PHASES = {
+    "activate": "activate",
+    "move": "move",
+    "lookup": "find_food_nearby",
+    "vision": "update_vision",
+    "track": "track",
+    "collide": "check_collision",
+}
+OBSERVER_PHASES = {
+    "render": "on_render",
+    "events": "poll_events",
+}
+PHASES = tuple(WORLD_PHASES) + tuple(OBSERVER_PHASES)
+
+
+class PhaseProfiler(neat.reporting.BaseReporter):
+    # Wall time per tick phase, per generation. Attach it to a world as its
+    # last observer and add it to the population as a reporter. It swaps the
+    # phase methods of the world (and of the other observers) for timed
+    # wrappers for that run only, so nothing is timed and nothing costs
+    # anything when no profiler is attached.
+    #
+    # per_tick=True also keeps a (ticks, phases) array of every tick, which
+    # dump_ticks() writes out.
+    def __init__(self, per_tick=False):
+        self.per_tick = per_tick
+        self.generation = None
+        self.current = None
+        self.generations = []
+        self.tick_times = {}
+        self.last_world = None
+        self._tick = np.zeros(len(PHASES))
+        self._wrapped = []
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.current = {"generation": generation, "worlds": 0, "ticks": 0, "blob_ticks": 0,
+                        "sim_seconds": 0.0, "phases": dict.fromkeys(PHASES, 0.0)}
+        self._started = time.perf_counter()
+
+    def _timed(self, function, phase):
+        index = PHASES.index(phase)
+        tick = self._tick
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            result = function(*args)
+            tick[index] += clock() - start
+            return result
+        return timed
+
+    def _wrap(self, thing, phases):
+        for phase, method in phases.items():
+            if hasattr(thing, method):
+                setattr(thing, method, self._timed(getattr(thing, method), phase))
+                self._wrapped.append((thing, method))
+
+    def on_init(self, world):
+        if self.current is None:
+            self.start_generation(self.generation)
+        self._wrap(world, WORLD_PHASES)
+        for observer in world.observers:
+            if observer is not self:
+                self._wrap(observer, OBSERVER_PHASES)
+        self._world_totals = np.zeros(len(PHASES))
+        if self.per_tick:
+            self._ticks = np.zeros((world.ticks, len(PHASES)))
+        self._world_started = time.perf_counter()
+
+    def on_tick(self, world):
+        if self.per_tick:
+            self._ticks[world.tick - 1] = self._tick
+        self._world_totals += self._tick
+        self._tick[:] = 0.0
+
+    def on_cleanup(self, world):
+        for thing, method in self._wrapped:
+            delattr(thing, method)
+        self._wrapped = []
+        self._world_totals += self._tick
+        self._tick[:] = 0.0
+        if self.per_tick:
+            self.tick_times.setdefault(self.generation, []).append(self._ticks[:world.tick])
+        self.last_world = {"worlds": 1, "ticks": world.tick, "blob_ticks": world.tick * world.num_blobs,
+                           "sim_seconds": time.perf_counter() - self._world_started,
+                           "phases": dict(zip(PHASES, self._world_totals.tolist()))}
+        self.add(self.last_world)
+
+    def add(self, summary):
+        # Fold in one world's numbers (from here or from a worker process)
+        if self.current is None:
+            self.start_generation(self.generation)
+        for key in ("worlds", "ticks", "blob_ticks", "sim_seconds"):
+            self.current[key] += summary[key]
+        for phase, seconds in summary["phases"].items():
+            self.current["phases"][phase] += seconds
+
+    def post_evaluate(self, config, population, species, best_genome):
+        current = self.current
+        current["wall_seconds"] = time.perf_counter() - self._started
+        current["ticks_per_second"] = current["ticks"] / current["wall_seconds"]
+        current["blob_ticks_per_second"] = current["blob_ticks"] / current["wall_seconds"]
+        self.generations.append(current)
+        self.current = None
+
+        timed = sum(current["phases"].values()) or 1.0
+        phases = ", ".join("{0} {1:.0%}".format(phase, seconds / timed)
+                           for phase, seconds in current["phases"].items() if seconds)
+        print("Ticks/sec: {0:.0f} ({1:.0f} blob-ticks/sec) -- {2}".format(
+            current["ticks_per_second"], current["blob_ticks_per_second"], phases))
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump({"phases": PHASES, "generations": self.generations}, f, indent=2)
+
+    def dump_ticks(self, path):
+        # One (ticks, phases) array per world, named gen<G>_<n>
+        arrays = {"gen{0}_{1}".format(generation, n): ticks
+                  for generation, worlds in self.tick_times.items()
+                  for n, ticks in enumerate(worlds)}
+        np.savez_compressed(path, phases=np.array(PHASES), **arrays)
@@ -0,0 +1,176 @@
+import json
+import os
+
+import neat
+import numpy as np
+
+
+# Trajectory recordings. Every recorded world gets a directory of flat binary
+# files, one column each, appended to as the run goes and read back with
+# np.memmap, so nothing is pickled and nothing has to fit in memory:
+#
+#   meta.json    sizes, genome ids, first food layout, fitness at the end
+#   x.f32, y.f32, angle.f32
+#                (ticks, blobs) float32, one row per recorded tick
+#   output.u8    (ticks, blobs) network outputs, bit k set for output k > 0.5
+#                (so up to 8 outputs)
+#   eats.bin     EAT records: a blob ate a food item
+#   food.bin     FOOD records: a food item moved, appeared or went away
+#
+# Ticks are the world's tick number after the step; with every > 1 only
+# every n-th tick is kept, eat and food records are always kept.
+EAT = np.dtype([("tick", "<i4"), ("blob", "<i4"), ("food", "<i4")])
+FOOD = np.dtype([("tick", "<i4"), ("food", "<i4"), ("x", "<f4"), ("y", "<f4"), ("active", "u1")])
+# Column -> (file name, dtype)
+COLUMNS = {"x": ("x.f32", "<f4"), "y": ("y.f32", "<f4"), "angle": ("angle.f32", "<f4"),
+           "output": ("output.u8", "u1")}
+
+
+class Recorder(neat.reporting.BaseReporter):
+    # Streams the worlds it is attached to into directory/gen-<G>/. Add it to
+    # the population as a reporter too, so it knows the generation; a second
+    # world in the same generation goes to gen-<G>-1 and so on.
+    #
+    # Rows are buffered `chunk` ticks at a time and appended to the files.
+    def __init__(self, directory, every=1, generations=None, chunk=256):
+        self.directory = directory
+        self.every = every
+        self.generations = set(generations) if generations is not None else None
+        self.chunk = chunk
+        self.generation = None
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def path(self):
+        name = "gen-{0:04d}".format(self.generation) if self.generation is not None else "world"
+        path = os.path.join(self.directory, name)
+        n = 0
+        while os.path.exists(path):
+            n += 1
+            path = os.path.join(self.directory, "{0}-{1}".format(name, n))
+        return path
+
+    def on_init(self, world):
+        if self.generations is not None and self.generation not in self.generations:
+            world.detach(self)
+            return
+        self.dir = self.path()
+        os.makedirs(self.dir)
+        n = world.num_blobs
+        self.buffers = {name: np.zeros((self.chunk, n), dtype=dtype)
+                        for name, (filename, dtype) in COLUMNS.items()}
+        self.buffered = 0
+        self.ticks = 0
+        self.files = {name: open(os.path.join(self.dir, filename), "wb")
+                      for name, (filename, dtype) in COLUMNS.items()}
+        self.eats = open(os.path.join(self.dir, "eats.bin"), "wb")
+        self.food = open(os.path.join(self.dir, "food.bin"), "wb")
+        self.food_x = world.food_x.copy()
+        self.food_y = world.food_y.copy()
+        self.food_active = world.food_active.copy()
+        self.meta = {
+            "generation": self.generation,
+            "genome_ids": [genome_id for genome_id, genome in world.genomes],
+            "arenas": world.arenas,
+            "num_blobs": n,
+            "num_food": world.num_food,
+            "num_outputs": world.batch_net.num_outputs,
+            "size": list(world.size),
+            "vision_cone_angle": world.vision_cone_angle,
+            "vision_cone_distance": world.vision_cone_distance,
+            "every": self.every,
+            "food_x": self.food_x.tolist(),
+            "food_y": self.food_y.tolist(),
+        }
+
+    def on_tick(self, world):
+        if len(world.eaten_blob):
+            records = np.zeros(len(world.eaten_blob), dtype=EAT)
+            records["tick"] = world.tick
+            records["blob"] = world.eaten_blob
+            records["food"] = world.eaten_food
+            records.tofile(self.eats)
+        # Used up food goes away even when none comes back
+        self.record_food(world)
+        if world.tick % self.every:
+            return
+
+        row = self.buffered
+        self.buffers["x"][row] = world.x
+        self.buffers["y"][row] = world.y
+        self.buffers["angle"][row] = world.angle
+        bits = (world.output > 0.5) << np.arange(world.output.shape[1])
+        self.buffers["output"][row] = bits.sum(axis=1)
+        self.buffered += 1
+        self.ticks += 1
+        if self.buffered == self.chunk:
+            self.flush()
+
+    def record_food(self, world):
+        changed = ((world.food_x != self.food_x) | (world.food_y != self.food_y) |
+                   (world.food_active != self.food_active)).nonzero()[0]
+        if len(changed):
+            records = np.zeros(len(changed), dtype=FOOD)
+            records["tick"] = world.tick
+            records["food"] = changed
+            records["x"] = world.food_x[changed]
+            records["y"] = world.food_y[changed]
+            records["active"] = world.food_active[changed]
+            records.tofile(self.food)
+            self.food_x[changed] = world.food_x[changed]
+            self.food_y[changed] = world.food_y[changed]
+            self.food_active[changed] = world.food_active[changed]
+
+    def flush(self):
+        for name, f in self.files.items():
+            self.buffers[name][:self.buffered].tofile(f)
+        self.buffered = 0
+
+    def on_cleanup(self, world):
+        self.flush()
+        for f in list(self.files.values()) + [self.eats, self.food]:
+            f.close()
+        self.meta["ticks"] = self.ticks
+        self.meta["last_tick"] = world.tick
+        self.meta["fitness"] = [genome.fitness for genome_id, genome in world.genomes]
+        with open(os.path.join(self.dir, "meta.json"), "w") as f:
+            json.dump(self.meta, f)
+
+
+class Recording:
+    # One recorded world, read back without loading it all: the columns are
+    # memory-mapped (ticks, blobs) arrays
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.num_blobs = self.meta["num_blobs"]
+        self.ticks = self.meta["ticks"]
+        for name, (filename, dtype) in COLUMNS.items():
+            setattr(self, name, self.column(filename, dtype))
+        self.eats = np.fromfile(os.path.join(path, "eats.bin"), dtype=EAT)
+        self.food = np.fromfile(os.path.join(path, "food.bin"), dtype=FOOD)
+
+    def column(self, filename, dtype):
+        if not self.ticks or not self.num_blobs:
+            return np.zeros((self.ticks, self.num_blobs), dtype=dtype)
+        return np.memmap(os.path.join(self.path, filename), dtype=dtype, mode="r",
+                         shape=(self.ticks, self.num_blobs))
+
+    def tick_of(self, row):
+        # World tick a recorded row was taken at
+        return (row + 1) * self.meta["every"]
+
+    def rows_of(self, genome_id):
+        # Blob rows of a genome, one per arena
+        index = self.meta["genome_ids"].index(genome_id)
+        num_genomes = len(self.meta["genome_ids"])
+        return [arena * num_genomes + index for arena in range(self.meta["arenas"])]
+
+
+def recordings(directory):
+    # Every recording in a run directory, in generation order
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                   if os.path.exists(os.path.join(directory, name, "meta.json")))
+    return [Recording(path) for path in paths]
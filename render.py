@@ -0,0 +1,113 @@
+# Only imported when something is actually going to be drawn, so headless
+# runs never load pygame.
+import math
+import os
+
+import neat
+import pygame
+
+from world import LOCAL_DIR
+
+
+class Renderer(neat.reporting.BaseReporter):
+    # Draws a World from the outside. Attach it to a world to watch that
+    # generation; add it to the population as a reporter too and it only
+    # switches itself on for the chosen generations. Worlds with several
+    # arenas show the first one.
+    def __init__(self, every=1, generations=None):
+        self.every = every
+        self.generations = set(generations) if generations is not None else None
+        self.generation = None
+        self._display_surf = None
+        # Blob sprite rotated to each whole-degree angle, filled in as the
+        # angles show up and kept for as long as the display is
+        self._rotated = {}
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def wants(self, world):
+        if self.generations is None or self.generation is None:
+            return True
+        return self.generation in self.generations
+
+    def on_init(self, world):
+        if not self.wants(world):
+            world.detach(self)
+            return
+        if self._display_surf is None:
+            pygame.init()
+            self._display_surf = pygame.display.set_mode(world.size, pygame.HWSURFACE | pygame.DOUBLEBUF)
+            self._image_surf = pygame.image.load(os.path.join(LOCAL_DIR, "blob.png")).convert_alpha()
+            self.food_surf = pygame.image.load(os.path.join(LOCAL_DIR, "food.png")).convert_alpha()
+        self.on_render(world)
+
+    def on_tick(self, world):
+        if world.tick % self.every:
+            return
+        self.poll_events(world)
+        if self._display_surf is not None:
+            self.on_render(world)
+
+    def poll_events(self, world):
+        for event in pygame.event.get():
+            self.on_event(world, event)
+
+    def on_event(self, world, event):
+        # Closing the window stops the drawing, the simulation carries on
+        if event.type == pygame.QUIT:
+            world.detach(self)
+            self.close()
+            self.generations = set()
+
+    def on_render(self, world):
+        self._display_surf.fill((0, 0, 0))
+
+        blobs = world.arena_blobs(0)
+        xs, ys, angles = world.x[blobs].tolist(), world.y[blobs].tolist(), world.angle[blobs].tolist()
+        for x, y, angle in zip(xs, ys, angles):
+            rotated_image = self.rotated(angle)
+            rect = rotated_image.get_rect(center=(x, y))
+            self._display_surf.blit(rotated_image, rect.topleft)
+
+        for food, active in zip(world.food_list[:world.num_food], world.food_active.tolist()):
+            if active:
+                self._display_surf.blit(self.food_surf, food)
+
+        for x, y, angle in zip(xs, ys, angles):
+            self.draw_vision_cone(world, x, y, angle)
+
+        pygame.display.flip()
+
+    def rotated(self, angle):
+        # Blobs only ever turn whole degrees, so 360 sprites cover every
+        # angle
+        angle = int(angle) % 360
+        image = self._rotated.get(angle)
+        if image is None:
+            image = self._rotated[angle] = pygame.transform.rotate(self._image_surf, angle)
+        return image
+
+    def draw_vision_cone(self, world, x, y, angle):
+        radian_angle = math.radians(angle)
+        cone_points = [(x, y)]
+
+        for angle_offset in [-world.vision_cone_angle / 2, world.vision_cone_angle / 2]:
+            cone_angle = radian_angle + math.radians(angle_offset)
+            cone_point_x = x + world.vision_cone_distance * math.cos(cone_angle)
+            cone_point_y = y - world.vision_cone_distance * math.sin(cone_angle)
+            cone_points.append((cone_point_x, cone_point_y))
+
+        pygame.draw.polygon(self._display_surf, (0, 255, 0, 50), cone_points, 1)
+
+    def on_cleanup(self, world):
+        pass
+
+    def is_open(self):
+        return self._display_surf is not None
+
+    def close(self):
+        if self._display_surf is not None:
+            pygame.quit()
+            self._display_surf = None
+            self._rotated = {}
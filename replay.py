@@ -0,0 +1,126 @@
+import argparse
+import pickle
+
+import numpy as np
+import pygame
+
+from recording import Recording, recordings
+from render import Renderer
+
+
+# Plays back recordings made with --record, without simulating anything:
+#
+#   python replay.py runs/ --generation 12
+#   python replay.py runs/ --winner winner.pkl
+#
+# Shows arena 0, or just one genome's blob with --genome / --winner.
+
+
+class ReplayWorld:
+    # What the Renderer needs from a world, at one recorded tick
+    def __init__(self, recording, rows):
+        meta = recording.meta
+        self.recording = recording
+        self.rows = rows
+        self.size = tuple(meta["size"])
+        self.vision_cone_angle = meta["vision_cone_angle"]
+        self.vision_cone_distance = meta["vision_cone_distance"]
+        self.num_food = meta["num_food"]
+        self.start_x = np.array(meta["food_x"][:self.num_food])
+        self.start_y = np.array(meta["food_y"][:self.num_food])
+        self.tick = 0
+
+    def arena_blobs(self, arena):
+        return slice(None)
+
+    def seek(self, row):
+        recording = self.recording
+        self.tick = recording.tick_of(row)
+        self.x = np.asarray(recording.x[row, self.rows], dtype=float)
+        self.y = np.asarray(recording.y[row, self.rows], dtype=float)
+        self.angle = np.asarray(recording.angle[row, self.rows], dtype=float)
+
+        # Food of arena 0 as it was at this tick
+        food_x = self.start_x.copy()
+        food_y = self.start_y.copy()
+        self.food_active = np.ones(self.num_food, dtype=bool)
+        changed = np.zeros(self.num_food, dtype=int)
+        food = recording.food[(recording.food["tick"] <= self.tick) & (recording.food["food"] < self.num_food)]
+        food_x[food["food"]] = food["x"]
+        food_y[food["food"]] = food["y"]
+        self.food_active[food["food"]] = food["active"].astype(bool)
+        changed[food["food"]] = food["tick"]
+        if len(self.rows) == 1:
+            # Food this blob ate (since the item last moved) is gone for it
+            eats = recording.eats[(recording.eats["tick"] <= self.tick) &
+                                  (recording.eats["blob"] == self.rows[0]) &
+                                  (recording.eats["food"] < self.num_food)]
+            eats = eats[eats["tick"] > changed[eats["food"]]]
+            self.food_active[eats["food"]] = False
+        self.food_list = list(zip(food_x.tolist(), food_y.tolist()))
+
+
+def find_genome(directory, genome_id, fitness=None):
+    # The recording of the genome's best showing, the latest one on ties
+    found = None
+    for recording in recordings(directory):
+        if genome_id in recording.meta["genome_ids"]:
+            score = recording.meta["fitness"][recording.meta["genome_ids"].index(genome_id)]
+            if fitness is not None and score == fitness:
+                return recording
+            if found is None or score >= found[0]:
+                found = (score, recording)
+    if found is None:
+        raise SystemExit("genome {0} isn't in any recording under {1}".format(genome_id, directory))
+    return found[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back a recorded run.")
+    parser.add_argument("directory", help="directory given to --record")
+    parser.add_argument("--generation", type=int, metavar="G")
+    parser.add_argument("--genome", type=int, metavar="ID", help="only show this genome's blob")
+    parser.add_argument("--winner", metavar="FILE", help="show the genome pickled by --save-winner")
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--step", type=int, default=1, metavar="N", help="recorded ticks per frame")
+    parser.add_argument("--start", type=int, default=0, metavar="TICK")
+    args = parser.parse_args()
+
+    genome_id = args.genome
+    fitness = None
+    if args.winner:
+        with open(args.winner, "rb") as f:
+            winner = pickle.load(f)
+        genome_id, fitness = winner.key, winner.fitness
+
+    if args.generation is not None:
+        recording = Recording("{0}/gen-{1:04d}".format(args.directory.rstrip("/"), args.generation))
+    elif genome_id is not None:
+        recording = find_genome(args.directory, genome_id, fitness)
+    else:
+        recording = recordings(args.directory)[-1]
+
+    if genome_id is not None:
+        rows = recording.rows_of(genome_id)[:1]
+    else:
+        rows = list(range(len(recording.meta["genome_ids"])))
+    world = ReplayWorld(recording, rows)
+
+    renderer = Renderer()
+    clock = pygame.time.Clock()
+    first = max(args.start // recording.meta["every"] - 1, 0)
+    for row in range(first, recording.ticks, args.step):
+        world.seek(row)
+        if not renderer.is_open():
+            renderer.on_init(world)
+        else:
+            renderer.on_render(world)
+        pygame.display.set_caption("Generation {0}, tick {1}".format(recording.meta["generation"], world.tick))
+        if any(event.type == pygame.QUIT for event in pygame.event.get()):
+            break
+        clock.tick(args.fps)
+    renderer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import configparser
+import os
+
+import numpy as np
+
+from fitness import parse_fitness
+from food import DensityField, ImmediateRespawn, NoRespawn, TimedRespawn
+from stopping import STOP_CONDITIONS
+from sensors import num_inputs, parse_sensors
+from world import LOCAL_DIR, NUM_OUTPUTS, png_size
+
+
+# Scenario files: every world setting in one INI file (see
+# scenario_default.ini), loaded and checked once at startup. A Scenario is
+# also the world factory handed to the evaluators: scenario(seed) builds a
+# world with those settings, in any process.
+
+def _bool(value):
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError("not a boolean: {!r}".format(value))
+
+
+def _names(value):
+    return tuple(name.strip() for name in value.split(",") if name.strip())
+
+
+# (section, key) -> how to read it. A missing key (or None) leaves the
+# world's own setting alone
+FIELDS = {
+    ("world", "width"): int,
+    ("world", "height"): int,
+    ("world", "regions"): int,
+    ("world", "ticks"): int,
+    ("world", "dt"): float,
+    ("world", "decide_every"): int,
+    ("world", "arenas"): int,
+    ("blobs", "speed"): float,
+    ("blobs", "rotation_speed"): float,
+    ("blobs", "vision_cone_angle"): float,
+    ("blobs", "vision_cone_distance"): float,
+    ("blobs", "sensors"): _names,
+    ("food", "num_food"): int,
+    ("food", "respawn"): str,
+    ("food", "respawn_delay"): int,
+    ("food", "density"): str,
+    ("food", "consume"): _bool,
+    ("rules", "hunger_cap"): float,
+    ("rules", "starve_after"): float,
+    ("rules", "stop"): _names,
+    ("fitness", "components"): str,
+}
+KEYS = {key: (section, key) for section, key in FIELDS}
+
+
+class ScenarioError(ValueError):
+    pass
+
+
+class Scenario:
+    # Relative paths in a scenario (the density field) are relative to this
+    directory = LOCAL_DIR
+
+    def __init__(self, world_type, settings=None):
+        self.world_type = world_type
+        self.settings = {}
+        self.update(settings or {})
+
+    @classmethod
+    def load(cls, world_type, path):
+        parser = configparser.ConfigParser()
+        if not parser.read(path):
+            raise ScenarioError("can't read scenario {}".format(path))
+        settings = {}
+        for section in parser.sections():
+            for key, value in parser.items(section):
+                if (section, key) not in FIELDS:
+                    raise ScenarioError("{}: unknown setting [{}] {}".format(path, section, key))
+                settings[key] = value
+        scenario = cls(world_type)
+        scenario.directory = os.path.dirname(os.path.abspath(path))
+        scenario.update(settings)
+        return scenario
+
+    def update(self, settings):
+        # Settings by key, either as text (from a file or --set) or already
+        # as values
+        for key, value in settings.items():
+            if key not in KEYS:
+                raise ScenarioError("unknown setting {!r}".format(key))
+            if isinstance(value, str) and FIELDS[KEYS[key]] is not str:
+                try:
+                    value = FIELDS[KEYS[key]](value)
+                except ValueError as e:
+                    raise ScenarioError("{}: {}".format(key, e))
+            self.settings[key] = value
+        self.validate()
+
+    def set(self, assignment):
+        # "key=value", as given to --set
+        key, _, value = assignment.partition("=")
+        self.update({key.strip(): value.strip()})
+
+    def get(self, key, default=None):
+        value = self.settings.get(key)
+        return default if value is None else value
+
+    def validate(self):
+        get = self.get
+        for key in ("width", "height", "regions", "ticks", "decide_every", "arenas", "dt",
+                    "vision_cone_distance"):
+            if get(key) is not None and get(key) <= 0:
+                raise ScenarioError("{} must be positive".format(key))
+        if get("num_food") is not None and get("num_food") < 0:
+            raise ScenarioError("num_food can't be negative")
+        if get("vision_cone_angle") is not None and not 0 < get("vision_cone_angle") <= 360:
+            raise ScenarioError("vision_cone_angle must be in (0, 360]")
+        try:
+            parse_sensors(get("sensors", ()))
+        except ValueError as e:
+            raise ScenarioError(str(e))
+        unknown = set(get("stop", ())) - set(STOP_CONDITIONS)
+        if unknown:
+            raise ScenarioError("unknown stop conditions {} (known: {})".format(
+                ", ".join(sorted(unknown)), ", ".join(sorted(STOP_CONDITIONS))))
+        if get("respawn", "none") not in ("none", "immediate", "timed"):
+            raise ScenarioError("respawn must be none, immediate or timed")
+        if get("respawn") == "timed" and not get("respawn_delay"):
+            raise ScenarioError("timed respawn needs a respawn_delay")
+        if get("components") is not None:
+            try:
+                parse_fitness(get("components"))
+            except ValueError as e:
+                raise ScenarioError(str(e))
+
+        # Derived once here rather than in every process: the density field
+        # and the longest step a blob takes
+        self.density = None
+        if get("density"):
+            path = os.path.join(self.directory, get("density"))
+            try:
+                self.density = DensityField(np.loadtxt(path, ndmin=2))
+            except (OSError, ValueError) as e:
+                raise ScenarioError("density {}: {}".format(path, e))
+        blob_size = png_size(os.path.join(LOCAL_DIR, "blob.png"))
+        food_size = png_size(os.path.join(LOCAL_DIR, "food.png"))
+        step = get("speed", 1) * get("dt", 1)
+        if step + max(blob_size) + max(food_size) > get("vision_cone_distance", 200):
+            raise ScenarioError("a step of {} px (speed * dt) is too long for vision_cone_distance {}".format(
+                step, get("vision_cone_distance", 200)))
+
+    def check(self, config):
+        # The network has to match what the world feeds it and reads back
+        sensors = self.get("sensors", self.world_type.sensors)
+        genome_config = config.genome_config
+        if genome_config.num_inputs != num_inputs(sensors):
+            raise ScenarioError("the NEAT config has num_inputs = {} but the world feeds {} ({})".format(
+                genome_config.num_inputs, num_inputs(sensors), ", ".join(sensors)))
+        if genome_config.num_outputs != NUM_OUTPUTS:
+            raise ScenarioError("the NEAT config has num_outputs = {} but the world reads {}".format(
+                genome_config.num_outputs, NUM_OUTPUTS))
+
+    def __repr__(self):
+        # Everything that decides what a world built from this does, e.g.
+        # for the fitness cache
+        return "Scenario({0}.{1}, {2!r})".format(self.world_type.__module__, self.world_type.__qualname__,
+                                                 sorted(self.settings.items()))
+
+    def food_policy(self):
+        respawn = self.get("respawn", "none")
+        if respawn == "immediate":
+            return ImmediateRespawn(self.density)
+        if respawn == "timed":
+            return TimedRespawn(self.get("respawn_delay"), self.density)
+        return NoRespawn(self.density)
+
+    def __call__(self, seed=None):
+        get = self.get
+        components = get("components")
+        world = self.world_type(
+            seed, stop_conditions=[STOP_CONDITIONS[name]() for name in get("stop", ())],
+            hunger_cap=get("hunger_cap"), starve_after=get("starve_after"),
+            food_policy=self.food_policy(), consume_food=get("consume", False),
+            arenas=get("arenas", 1), dt=get("dt", 1), decide_every=get("decide_every", 1),
+            ticks=get("ticks"), fitness_components=parse_fitness(components) if components else None)
+        for key in ("width", "height", "regions", "speed", "rotation_speed", "vision_cone_angle",
+                    "vision_cone_distance", "num_food", "sensors"):
+            if get(key) is not None:
+                setattr(world, key, get(key))
+        return world
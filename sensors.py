@@ -0,0 +1,227 @@
+import numpy as np
+
+from spatial import PointGrid
+
+
+# Network inputs. A world's `sensors` is a list of names, each optionally
+# with a count ("rays:5"); every sensor gives one or more columns of the
+# input matrix, computed for all blobs at once when the networks run:
+#
+#   num_food_seen, hunger, dist_food, diff_angle, region_in
+#                    the per-blob values the world keeps anyway
+#   nearest_wall     distance to the closest edge of the arena
+#   walls            distances to the left, right, top and bottom edges
+#   rays:N           N rays spread evenly over the vision cone, each the
+#                    distance to the first food item it hits (or its length)
+#   wall_rays:N      the same rays, distance to the edge of the arena
+#   nearest_food:K   distance and angle (from the heading, degrees) of the K
+#                    closest food items in reach, in any direction
+#   neighbours:K     the same for the K closest other living blobs
+#
+# Food sensors reuse the (blob, food) pairs in reach that the world's vision
+# step already found (food a blob has eaten is invisible to it), so they
+# cost no extra lookups. "Nothing there" reads like the world's own vision:
+# the sensor's length for rays, 1000 and 180 for distance and angle.
+# Rays, nearest_food and neighbours measure to the middle of things.
+
+
+class Sensor:
+    # Columns this sensor adds
+    width = 1
+    # Whether a blob's reading depends on the other blobs (see
+    # World.interacting)
+    interacting = False
+    # Whether it reads the region the world works out every tick
+    uses_region = False
+
+    def on_init(self, world):
+        pass
+
+    def sense(self, world):
+        # (blobs,) or (blobs, width) array
+        raise NotImplementedError
+
+
+class Attribute(Sensor):
+    def __init__(self, name):
+        self.name = name
+        self.uses_region = name == "region_in"
+
+    def sense(self, world):
+        return getattr(world, self.name)
+
+
+class NearestWall(Sensor):
+    def sense(self, world):
+        world.distance_to_nearest_wall()
+        return world.nearest_wall
+
+
+class Walls(Sensor):
+    width = 4
+
+    def sense(self, world):
+        return np.column_stack((world.x, world.width - world.x, world.y, world.height - world.y))
+
+
+class Rays(Sensor):
+    def __init__(self, count=5):
+        self.width = self.count = count
+
+    def on_init(self, world):
+        half = world.vision_cone_angle / 2
+        self.offsets = np.linspace(-half, half, self.count) if self.count > 1 else np.zeros(1)
+        self.length = world.vision_cone_distance
+
+    def directions(self, world):
+        # (blobs, rays) unit vectors, in screen coordinates (y grows down)
+        angle = np.radians(world.angle[:, None] + self.offsets)
+        return np.cos(angle), -np.sin(angle)
+
+    def sense(self, world):
+        # A ray hits a food item when the angle between the ray and the
+        # item's middle is within asin(radius / distance), so every pair
+        # only gets the exact test for the few rays in that range
+        hit = np.full((world.num_blobs, self.count), float(self.length))
+        blob, food = world.reach_blob, world.reach_food
+        if not len(blob):
+            return hit
+        food_w, food_h = world.food_size
+        radius = max(food_w, food_h) / 2
+        to_x = world.food_x[food] + food_w / 2 - world.x[blob]
+        to_y = world.food_y[food] + food_h / 2 - world.y[blob]
+        distance = np.sqrt(to_x * to_x + to_y * to_y)
+        # Ray offsets turn the same way as world.angle, the other way round
+        # from relative_angle
+        angle = -relative_angle(world, blob, to_x, to_y)
+        with np.errstate(divide="ignore"):
+            spread = np.degrees(np.arcsin(np.minimum(radius / distance, 1)))
+        pairs, rays = [], []
+        for shift in (-360, 0, 360):
+            first = np.searchsorted(self.offsets, angle + shift - spread, "left")
+            last = np.searchsorted(self.offsets, angle + shift + spread, "right")
+            some = (first < last).nonzero()[0]
+            count = last[some] - first[some]
+            pair = np.repeat(some, count)
+            pairs.append(pair)
+            rays.append(first[pair] + np.arange(len(pair)) - np.repeat(np.cumsum(count) - count, count))
+        pair, ray = np.concatenate(pairs), np.concatenate(rays)
+
+        # Exact test along and across each candidate ray
+        direction = np.radians(world.angle[blob[pair]] + self.offsets[ray])
+        ray_x, ray_y = np.cos(direction), -np.sin(direction)
+        along = to_x[pair] * ray_x + to_y[pair] * ray_y
+        across = to_x[pair] * ray_y - to_y[pair] * ray_x
+        touched = (along > 0) & (across * across <= radius * radius)
+        pair, ray, along, across = pair[touched], ray[touched], along[touched], across[touched]
+        np.minimum.at(hit, (blob[pair], ray), np.maximum(along - np.sqrt(radius * radius - across * across), 0))
+        return hit
+
+
+class WallRays(Rays):
+    def sense(self, world):
+        ray_x, ray_y = self.directions(world)
+        x, y = world.x[:, None], world.y[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            to_x = np.where(ray_x > 0, (world.width - x) / ray_x, np.where(ray_x < 0, -x / ray_x, np.inf))
+            to_y = np.where(ray_y > 0, (world.height - y) / ray_y, np.where(ray_y < 0, -y / ray_y, np.inf))
+        return np.clip(np.minimum(to_x, to_y), 0, self.length)
+
+
+def relative_angle(world, blob, to_x, to_y):
+    # Angle from each blob's heading to a vector, in (-180, 180] degrees,
+    # the way diff_angle has it
+    cos, sin = world.cos[blob], world.sin[blob]
+    return np.degrees(np.arctan2(sin * to_x + cos * to_y, cos * to_x - sin * to_y))
+
+
+def nearest(world, k, blob, to_x, to_y):
+    # (blobs, 2k) distance and angle (from the heading) of the k closest of
+    # the vectors from each blob. One sort on blob, then distance, puts every
+    # blob's closest first (a single float key sorts a lot faster than
+    # np.lexsort)
+    out = np.empty((world.num_blobs, 2 * k))
+    out[:, 0::2] = 1000.0
+    out[:, 1::2] = 180.0
+    if not len(blob):
+        return out
+    distance_sq = to_x * to_x + to_y * to_y
+    order = np.argsort(blob * (distance_sq.max() + 1) + distance_sq, kind="stable")
+    blob = blob[order]
+    starts = np.r_[0, (blob[1:] != blob[:-1]).nonzero()[0] + 1]
+    rank = np.arange(len(blob)) - np.repeat(starts, np.diff(np.r_[starts, len(blob)]))
+    keep = rank < k
+    order, blob, rank = order[keep], blob[keep], rank[keep]
+    out[blob, 2 * rank] = np.sqrt(distance_sq[order])
+    out[blob, 2 * rank + 1] = relative_angle(world, blob, to_x[order], to_y[order])
+    return out
+
+
+class NearestFood(Sensor):
+    def __init__(self, count=3):
+        self.count = count
+        self.width = 2 * count
+
+    def sense(self, world):
+        blob, food = world.reach_blob, world.reach_food
+        food_w, food_h = world.food_size
+        to_x = world.food_x[food] + food_w / 2 - world.x[blob]
+        to_y = world.food_y[food] + food_h / 2 - world.y[blob]
+        return nearest(world, self.count, blob, to_x, to_y)
+
+
+class Neighbours(Sensor):
+    # Blobs are put in a grid of their own every time, built in one go
+    interacting = True
+
+    def __init__(self, count=3):
+        self.count = count
+        self.width = 2 * count
+
+    def on_init(self, world):
+        self.reach = world.vision_cone_distance
+        self.grid = PointGrid(world.width, world.height, self.reach, layers=world.arenas)
+
+    def sense(self, world):
+        self.grid.fill(world.x, world.y, world.blob_arena)
+        blob, other = self.grid.query(world.x, world.y, world.blob_arena)
+        keep = (blob != other) & world.alive[other]
+        blob, other = blob[keep], other[keep]
+        to_x = world.x[other] - world.x[blob]
+        to_y = world.y[other] - world.y[blob]
+        near = to_x * to_x + to_y * to_y <= self.reach * self.reach
+        return nearest(world, self.count, blob[near], to_x[near], to_y[near])
+
+
+ATTRIBUTES = ("num_food_seen", "hunger", "dist_food", "diff_angle", "region_in")
+SENSOR_TYPES = {
+    "nearest_wall": NearestWall,
+    "walls": Walls,
+    "rays": Rays,
+    "wall_rays": WallRays,
+    "nearest_food": NearestFood,
+    "neighbours": Neighbours,
+}
+# The ones that take a count
+COUNTED = ("rays", "wall_rays", "nearest_food", "neighbours")
+
+
+def parse_sensor(spec):
+    # "rays:5" -> Rays(5)
+    name, _, count = spec.strip().partition(":")
+    if name not in ATTRIBUTES and name not in SENSOR_TYPES:
+        raise ValueError("unknown sensor {!r} (known: {})".format(
+            name, ", ".join(ATTRIBUTES + tuple(sorted(SENSOR_TYPES)))))
+    if count and (name not in COUNTED or not count.isdigit() or int(count) < 1):
+        raise ValueError("sensor {!r}: only {} take a count of 1 or more".format(spec, ", ".join(COUNTED)))
+    if name in ATTRIBUTES:
+        return Attribute(name)
+    return SENSOR_TYPES[name](int(count)) if count else SENSOR_TYPES[name]()
+
+
+def parse_sensors(specs):
+    return [parse_sensor(spec) for spec in specs]
+
+
+def num_inputs(specs):
+    return sum(sensor.width for sensor in parse_sensors(specs))
@@ -0,0 +1,125 @@
+import socket
+import struct
+import time
+
+import neat
+import numpy as np
+
+
+# World snapshots for a viewer running in another process (see viewer.py).
+# A frame is a 4 byte length, a fixed header and then float32 arrays: blob x,
+# y and angle, then food x and y, for arena 0 of the world.
+HEADER = struct.Struct(">4sIIIIHHHH")
+MAGIC = b"BLB1"
+
+
+def encode(world, generation):
+    blobs = world.arena_blobs(0)
+    food = world.food_active[:world.num_food].nonzero()[0]
+    arrays = (world.x[blobs], world.y[blobs], world.angle[blobs], world.food_x[food], world.food_y[food])
+    body = b"".join(np.asarray(array, dtype=np.float32).tobytes() for array in arrays)
+    header = HEADER.pack(MAGIC, generation or 0, world.tick, len(arrays[0]), len(food),
+                         world.width, world.height, int(world.vision_cone_angle),
+                         int(world.vision_cone_distance))
+    return struct.pack(">I", HEADER.size + len(body)) + header + body
+
+
+class Frame:
+    # A decoded snapshot. Looks enough like a World for Renderer.on_render
+    def __init__(self, data):
+        (magic, self.generation, self.tick, num_blobs, num_food, width, height,
+         self.vision_cone_angle, self.vision_cone_distance) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a snapshot")
+        self.size = self.width, self.height = width, height
+        arrays = np.frombuffer(data, dtype=np.float32, offset=HEADER.size).astype(float)
+        self.x, self.y, self.angle = arrays[:3 * num_blobs].reshape(3, num_blobs)
+        food_x, food_y = arrays[3 * num_blobs:].reshape(2, num_food)
+        self.food_list = list(zip(food_x.tolist(), food_y.tolist()))
+        self.num_food = num_food
+        self.food_active = np.ones(num_food, dtype=bool)
+
+    def arena_blobs(self, arena):
+        return slice(None)
+
+
+class SnapshotPublisher(neat.reporting.BaseReporter):
+    # Sends snapshots of the world to a viewer at most `fps` times a second.
+    # Attach it to a world as an observer and add it to the population as a
+    # reporter.
+    #
+    # It never waits on the viewer: the socket is non-blocking, a frame that
+    # the viewer hasn't taken yet means the new one is dropped, and with no
+    # viewer listening it only tries to connect once every `retry` seconds.
+    # Between frames a tick costs it one clock read.
+    def __init__(self, host="localhost", port=8765, fps=30, retry=1.0):
+        self.address = (host, port)
+        self.interval = 1.0 / fps
+        self.retry = retry
+        self.generation = None
+        self.sock = None
+        self.pending = b""
+        self.next_frame = 0.0
+        self.next_connect = 0.0
+        self.sent = 0
+        self.dropped = 0
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def on_init(self, world):
+        self.next_frame = 0.0
+
+    def on_tick(self, world):
+        now = time.perf_counter()
+        if now < self.next_frame:
+            return
+        self.next_frame = now + self.interval
+        if self.sock is None and not self.connect(now):
+            return
+        if self.pending:
+            self.flush()
+            # The viewer went away
+            if self.sock is None:
+                return
+            if self.pending:
+                self.dropped += 1
+                return
+        self.pending = memoryview(encode(world, self.generation))
+        self.sent += 1
+        self.flush()
+
+    def on_cleanup(self, world):
+        pass
+
+    def connect(self, now):
+        if now < self.next_connect:
+            return False
+        self.next_connect = now + self.retry
+        try:
+            # Meant for a viewer on this machine, where connecting (or being
+            # refused) is immediate
+            self.sock = socket.create_connection(self.address, timeout=0.05)
+        except OSError:
+            return False
+        self.sock.setblocking(False)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.pending = b""
+        return True
+
+    def flush(self):
+        try:
+            sent = self.sock.send(self.pending)
+        except BlockingIOError:
+            return
+        except OSError:
+            # Viewer went away
+            self.close()
+            return
+        self.pending = self.pending[sent:]
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.pending = b""
@@ -0,0 +1,116 @@
+import numpy as np
+
+
+class FoodGrid:
+    # Uniform grid over the food positions. Every cell keeps the ids of the
+    # food inside it in a fixed width row of `slots` (-1 = empty), so looking
+    # up the 3x3 block of cells around all blobs is one fancy-indexing call.
+    # Food can be added, moved and removed one item at a time without
+    # rebuilding anything.
+    #
+    # With cell_size >= the search radius, any food within that radius of a
+    # blob is in the 3x3 block around the blob's cell.
+    #
+    # layers stacks that many separate grids over the same area (one per
+    # arena of a multi-arena world); food in one layer is only ever found
+    # from points in the same layer.
+    def __init__(self, width, height, cell_size, capacity=4, layers=1):
+        self.cell_size = cell_size
+        self.cols = int(-(-width // cell_size))
+        self.rows = int(-(-height // cell_size))
+        # Points outside the arena are clamped onto the edge cells, and one
+        # empty ring of cells around it keeps the neighbours of edge cells in
+        # range
+        self.padded_cols = self.cols + 2
+        self.padded_rows = self.rows + 2
+        self.layer_cells = self.padded_rows * self.padded_cols
+        self.slots = np.full((layers * self.layer_cells, capacity), -1)
+        self.count = np.zeros(layers * self.layer_cells, dtype=int)
+        self.food_cell = np.zeros(0, dtype=int)
+        self.food_slot = np.zeros(0, dtype=int)
+        offsets = np.array([-1, 0, 1])
+        self.neighbours = (offsets[:, None] * self.padded_cols + offsets).ravel()
+
+    def cell_of(self, x, y, layer=0):
+        col = np.clip(np.floor_divide(x, self.cell_size), 0, self.cols - 1) + 1
+        row = np.clip(np.floor_divide(y, self.cell_size), 0, self.rows - 1) + 1
+        return (layer * self.layer_cells + row * self.padded_cols + col).astype(int)
+
+    def _grow(self, size):
+        if size > len(self.food_cell):
+            self.food_cell = np.concatenate((self.food_cell, np.full(size - len(self.food_cell), -1)))
+            self.food_slot = np.concatenate((self.food_slot, np.full(size - len(self.food_slot), -1)))
+
+    def insert(self, food_id, x, y, layer=0):
+        self._grow(food_id + 1)
+        cell = int(self.cell_of(x, y, layer))
+        slot = self.count[cell]
+        if slot == self.slots.shape[1]:
+            self.slots = np.concatenate((self.slots, np.full_like(self.slots, -1)), axis=1)
+        self.slots[cell, slot] = food_id
+        self.count[cell] += 1
+        self.food_cell[food_id] = cell
+        self.food_slot[food_id] = slot
+
+    def remove(self, food_id):
+        cell = self.food_cell[food_id]
+        if cell < 0:
+            return
+        # Fill the hole with the last item of the cell to keep it packed
+        slot = self.food_slot[food_id]
+        last = self.count[cell] - 1
+        moved = self.slots[cell, last]
+        self.slots[cell, slot] = moved
+        self.food_slot[moved] = slot
+        self.slots[cell, last] = -1
+        self.count[cell] -= 1
+        self.food_cell[food_id] = -1
+        self.food_slot[food_id] = -1
+
+    def move(self, food_id, x, y):
+        # Stays in its layer
+        layer = self.food_cell[food_id] // self.layer_cells
+        self.remove(food_id)
+        self.insert(food_id, x, y, layer)
+
+    def __contains__(self, food_id):
+        return food_id < len(self.food_cell) and self.food_cell[food_id] >= 0
+
+    def query(self, x, y, layer=0):
+        # All (point, food) pairs where the food sits in the 3x3 block of
+        # cells around the point (in the point's layer). Pairs come out
+        # grouped by point, with the food ids of each point in no particular
+        # order
+        width = max(int(self.count.max()), 1)
+        cells = self.cell_of(x, y, layer)[:, None] + self.neighbours
+        candidates = self.slots[cells, :width].reshape(len(cells), -1)
+        point, column = np.nonzero(candidates >= 0)
+        return point, candidates[point, column]
+
+
+class PointGrid:
+    # The same grid for points that all move every tick (blobs): rebuilt in
+    # one go with fill(), kept as the points sorted by cell plus where each
+    # cell starts, so a query gives exactly the pairs in the 3x3 blocks with
+    # no padding however crowded a cell gets.
+    def __init__(self, width, height, cell_size, layers=1):
+        self.grid = FoodGrid(width, height, cell_size, capacity=1, layers=layers)
+        self.order = np.zeros(0, dtype=int)
+        self.count = np.zeros(layers * self.grid.layer_cells, dtype=int)
+        self.first = np.zeros_like(self.count)
+
+    def fill(self, x, y, layer=0):
+        cells = self.grid.cell_of(x, y, layer)
+        self.order = np.argsort(cells, kind="stable")
+        self.count = np.bincount(cells, minlength=len(self.count))
+        self.first = np.cumsum(self.count) - self.count
+
+    def query(self, x, y, layer=0):
+        # All (point, other) pairs where other is in the 3x3 block of cells
+        # around point, grouped by point
+        cells = (self.grid.cell_of(x, y, layer)[:, None] + self.grid.neighbours).ravel()
+        count = self.count[cells]
+        total = count.sum()
+        point = np.repeat(np.arange(len(cells)) // len(self.grid.neighbours), count)
+        start = np.repeat(self.first[cells] - (np.cumsum(count) - count), count)
+        return point, self.order[start + np.arange(total)]
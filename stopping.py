@@ -0,0 +1,56 @@
+# Stop conditions end a world's evaluation early once nothing can change the
+# fitness any more, so the result is the same as running all the ticks.
+# World.on_execute asks them every `check_every` ticks and stops as soon as
+# one of them says so.
+
+
+def fixed_blobs(world):
+    # Blobs that will do exactly the same thing every tick from now on: the
+    # inputs they will see next tick are the ones they just acted on (inputs
+    # their net never reads don't count), they didn't eat, and either
+    # - they didn't move or turn, so nothing about them changes, or
+    # - they are outside the arena, heading straight away from it and too far
+    #   out to ever see or touch food again, so they keep doing that.
+    same = ((world.blob_inputs() == world.inputs) | ~world.batch_net.uses_input).all(axis=1)
+    same &= ~world.ate
+
+    dx = world.direction * world.cos
+    dy = -world.direction * world.sin
+    reach = world.vision_cone_distance + max(world.blob_size) + max(world.food_size)
+    leaving = (((world.x < -reach) & (dx <= 0)) | ((world.x > world.width + reach) & (dx >= 0)) |
+               ((world.y < -reach) & (dy <= 0)) | ((world.y > world.height + reach) & (dy >= 0)))
+    receding = ~world.turned & (world.direction != 0) & leaving
+    return same & (world.still | receding)
+
+
+class Settled:
+    # Every blob is either dead or stuck repeating itself (see fixed_blobs)
+    def check(self, world):
+        if not world.food_static:
+            return False
+        return bool((~world.alive | fixed_blobs(world)).all())
+
+
+class Starved:
+    # Every blob went hungry for longer than the world's starve_after and
+    # died. Only means something in worlds with starvation switched on
+    def check(self, world):
+        return world.starve_after is not None and not world.alive.any()
+
+
+class FoodGone:
+    # Every living blob has eaten every food item (or all of it is used up)
+    # and none comes back. Exact only when fitness comes from eating alone;
+    # in a world that also scores where blobs go (world.scores_movement) it
+    # never fires
+    def check(self, world):
+        if world.scores_movement or not world.food_static:
+            return False
+        return not world.food_active.any() or bool(world.food_eaten.row_full(world.alive).all())
+
+
+STOP_CONDITIONS = {
+    "settled": Settled,
+    "starved": Starved,
+    "food": FoodGone,
+}
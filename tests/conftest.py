@@ -0,0 +1,29 @@
+import os
+import random
+import sys
+
+import neat
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def config():
+    return neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                       neat.DefaultStagnation, os.path.join(ROOT, "config_feed_foward.txt"))
+
+
+@pytest.fixture
+def genomes(config):
+    # Mutated a few times, so the networks actually differ
+    random.seed(1)
+    out = []
+    for key in range(1, 21):
+        genome = config.genome_type(key)
+        genome.configure_new(config.genome_config)
+        for _ in range(10):
+            genome.mutate(config.genome_config)
+        out.append((key, genome))
+    return out
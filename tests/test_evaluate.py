@@ -0,0 +1,25 @@
+import copy
+
+from evaluate import PoolEvaluator, SerialEvaluator
+from scenario import Scenario
+from world import World
+
+
+def fitness_of(evaluator, genomes, config):
+    genomes = copy.deepcopy(genomes)
+    evaluator.evaluate(genomes, config)
+    evaluator.close()
+    return [genome.fitness for genome_id, genome in genomes]
+
+
+def test_neighbours_make_a_world_interacting():
+    assert not World().interacting
+    assert Scenario(World, {"sensors": "num_food_seen,hunger,dist_food,neighbours:1"})().interacting
+
+
+def test_pool_matches_serial_with_neighbours(config, genomes):
+    # Blobs see each other, so the shared world can't be split into shards
+    scenario = Scenario(World, {"sensors": "num_food_seen,hunger,dist_food,neighbours:1", "ticks": 1000})
+    serial = fitness_of(SerialEvaluator(scenario, seed=3), genomes, config)
+    pool = fitness_of(PoolEvaluator(scenario, 4, "shared", seed=3), genomes, config)
+    assert pool == serial
@@ -0,0 +1,31 @@
+from fitness import Food
+from world import World
+
+
+class OneItem(World):
+    # Food right under the blobs' starting point
+    ticks = 1
+    sensors = ("num_food_seen", "hunger", "dist_food", "diff_angle", "region_in")
+
+    def reset_food(self):
+        food_w, food_h = self.food_size
+        return (self.width // 2 - food_w // 2, self.height // 2 - food_h // 2)
+
+
+def one_item(**kwargs):
+    world = OneItem(1, fitness_components=[Food()], **kwargs)
+    world.num_food = 1
+    return world
+
+
+def test_overlapping_blobs_share_food(config, genomes):
+    world = one_item()
+    world.on_execute(genomes[:2], config)
+    assert [genome.fitness for genome_id, genome in genomes[:2]] == [1, 1]
+
+
+def test_first_blob_uses_up_consumed_food(config, genomes):
+    world = one_item(consume_food=True)
+    world.on_execute(genomes[:2], config)
+    assert [genome.fitness for genome_id, genome in genomes[:2]] == [1, 0]
+    assert not world.food_active.any()
@@ -0,0 +1,270 @@
+import argparse
+import os
+import pickle
+import random
+
+import neat
+
+from checkpoint import Checkpointer, restore_checkpoint
+from evaluate import PoolEvaluator, SerialEvaluator
+from profiler import PhaseProfiler
+from scenario import Scenario, ScenarioError
+from stopping import STOP_CONDITIONS
+
+
+def eval_genomes(genomes, config, world_type, observers=()):
+    app = world_type()
+    for observer in observers:
+        app.attach(observer)
+    app.on_execute(genomes, config)
+
+
+def run(world_type, config_path, args):
+    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
+                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
+                                config_path)
+    # Everything about the world is settled and checked here, before any
+    # world is built or any worker started
+    try:
+        world_type = scenario(world_type, args)
+        world_type.check(config)
+    except ScenarioError as e:
+        raise SystemExit("error: {}".format(e))
+
+    if args.resume:
+        # The checkpoint brings its own config, population, species, RNG
+        # state and seed
+        p, seed = restore_checkpoint(args.resume)
+        print("Resuming from {} at generation {} (seed {})".format(args.resume, p.generation, seed))
+    else:
+        seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+        print("Seed: {}".format(seed))
+        # NEAT draws from the global random module
+        random.seed(seed)
+        p = neat.Population(config)
+    p.add_reporter(neat.StdOutReporter(True))
+    closing = []
+    if args.long_run:
+        # Statistics go to disk as the run goes, nothing piles up in memory
+        from longrun import StatsStream
+        stream = StatsStream(p, args.long_run, args.rotate_every, args.keep_files)
+        p.add_reporter(stream)
+        closing.append(stream)
+    else:
+        p.add_reporter(neat.StatisticsReporter())
+    if args.checkpoint_every:
+        p.add_reporter(Checkpointer(p, seed, args.checkpoint_every, None, args.checkpoint_prefix))
+
+    profiler = None
+    if args.profile:
+        profiler = PhaseProfiler(per_tick=args.profile_ticks is not None)
+        p.add_reporter(profiler)
+
+    cache = None
+    if args.cache:
+        from cache import FitnessCache
+        cache = FitnessCache(args.cache, repr(world_type))
+        p.add_reporter(cache)
+
+    if args.distribute:
+        from distributed import DistributedEvaluator, parse_address
+        evaluator = DistributedEvaluator(world_type, parse_address(args.distribute),
+                                         "isolated" if args.isolated else "shared", seed, profiler,
+                                         args.fixed_worlds, cache, local_workers=args.workers or 0,
+                                         timeout=args.task_timeout)
+        p.add_reporter(evaluator)
+        closing.append(evaluator)
+        fitness_function = evaluator.evaluate
+    elif args.workers:
+        evaluator = PoolEvaluator(world_type, args.workers, "isolated" if args.isolated else "shared", seed,
+                                  profiler, args.fixed_worlds, cache)
+        p.add_reporter(evaluator)
+        closing.append(evaluator)
+        fitness_function = evaluator.evaluate
+    else:
+        observers = []
+        if args.render_every or args.render_generation:
+            from render import Renderer
+            renderer = Renderer(args.render_every or 1, args.render_generation)
+            p.add_reporter(renderer)
+            observers.append(renderer)
+            closing.append(renderer)
+        if args.record:
+            from recording import Recorder
+            recorder = Recorder(args.record, args.record_every, args.record_generation)
+            p.add_reporter(recorder)
+            observers.append(recorder)
+        if args.heatmap:
+            from coverage import HeatmapRecorder
+            heatmaps = HeatmapRecorder(args.heatmap, args.heatmap_cell)
+            p.add_reporter(heatmaps)
+            observers.append(heatmaps)
+        if args.publish:
+            from snapshot import SnapshotPublisher
+            host, _, port = args.publish.rpartition(":")
+            publisher = SnapshotPublisher(host or "localhost", int(port), args.publish_fps)
+            p.add_reporter(publisher)
+            observers.append(publisher)
+            closing.append(publisher)
+        if profiler is not None:
+            # Last, so it sees the other observers' work for the same tick
+            observers.append(profiler)
+        evaluator = SerialEvaluator(world_type, seed, observers, args.fixed_worlds)
+        p.add_reporter(evaluator)
+        fitness_function = evaluator.evaluate
+
+    try:
+        winner = p.run(fitness_function, max(args.generations - p.generation, 0))
+    finally:
+        for thing in closing:
+            thing.close()
+        if profiler is not None:
+            profiler.dump(args.profile)
+            if args.profile_ticks:
+                profiler.dump_ticks(args.profile_ticks)
+    if args.save_winner and winner is not None:
+        with open(args.save_winner, "wb") as f:
+            pickle.dump(winner, f)
+    return winner
+
+
+def scenario(world_type, args):
+    # The scenario file (or the world's own settings), then --set, then the
+    # flags for single settings on top
+    scenario = Scenario.load(world_type, args.scenario) if args.scenario else Scenario(world_type)
+    for assignment in args.set or ():
+        scenario.set(assignment)
+    flags = {
+        "ticks": args.ticks,
+        "dt": args.dt,
+        "decide_every": args.decide_every,
+        "arenas": args.arenas,
+        "hunger_cap": args.hunger_cap,
+        "starve_after": args.starve_after,
+        "stop": tuple(args.stop) if args.stop else None,
+        "respawn": args.respawn,
+        "respawn_delay": args.respawn_delay,
+        "density": os.path.abspath(args.food_density) if args.food_density else None,
+        "consume": True if args.consume else None,
+        "components": args.fitness,
+    }
+    scenario.update({key: value for key, value in flags.items() if value is not None})
+    return scenario
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", metavar="FILE",
+                        help="world settings from an INI file (see scenario_default.ini); the flags below override it")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE",
+                        help="override one scenario setting, e.g. --set num_food=50 (can be repeated)")
+    parser.add_argument("--render-every", type=int, metavar="N",
+                        help="draw the world every N ticks (headless if not given)")
+    parser.add_argument("--render-generation", type=int, action="append", metavar="G",
+                        help="only draw generation G (can be repeated)")
+    parser.add_argument("--record", metavar="DIR",
+                        help="record every generation's trajectories and eat events under DIR (see replay.py)")
+    parser.add_argument("--record-every", type=int, default=1, metavar="N",
+                        help="with --record, keep positions every N ticks (default 1)")
+    parser.add_argument("--record-generation", type=int, action="append", metavar="G",
+                        help="with --record, only record generation G (can be repeated)")
+    parser.add_argument("--heatmap", metavar="DIR",
+                        help="save where the blobs went (visit heatmaps, cells per genome) to DIR/gen-G.npz")
+    parser.add_argument("--heatmap-cell", type=int, default=50, metavar="PX",
+                        help="with --heatmap, grid cell size in px (default 50)")
+    parser.add_argument("--publish", metavar="[HOST:]PORT",
+                        help="send live snapshots to a viewer (python viewer.py) listening on PORT")
+    parser.add_argument("--publish-fps", type=int, default=30, metavar="N",
+                        help="with --publish, send at most N snapshots a second (default 30)")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="evaluate genomes across N worker processes")
+    parser.add_argument("--isolated", action="store_true",
+                        help="with --workers or --distribute, give every genome a world of its own")
+    parser.add_argument("--fixed-worlds", action="store_true",
+                        help="seed worlds from the run seed alone: the same food layout every generation "
+                             "(and for every genome with --isolated)")
+    parser.add_argument("--cache", type=int, metavar="N",
+                        help="with --workers or --distribute, remember the fitness of up to N genomes by structure "
+                             "and world, and don't run them again (only pays off with --fixed-worlds; without "
+                             "it, only clones within a generation hit, and with --isolated nothing does)")
+    parser.add_argument("--distribute", metavar="[HOST:]PORT",
+                        help="evaluate genomes on workers that connect to PORT (python distributed.py HOST:PORT); "
+                             "with --workers, also start N of them here")
+    parser.add_argument("--task-timeout", type=float, metavar="SECONDS",
+                        help="with --distribute, hand a shard to another worker when one takes longer")
+    parser.add_argument("--seed", type=int,
+                        help="seed for the run: NEAT and every world built (random if not given)")
+    parser.add_argument("--generations", type=int, default=50, metavar="N",
+                        help="run until generation N (default 50, counting the ones before a resume)")
+    parser.add_argument("--checkpoint-every", type=int, metavar="N",
+                        help="save a checkpoint every N generations")
+    parser.add_argument("--checkpoint-prefix", default="neat-checkpoint-", metavar="PREFIX",
+                        help="checkpoint file names are PREFIX followed by the generation to resume at")
+    parser.add_argument("--resume", metavar="FILE",
+                        help="carry on a run from a checkpoint")
+    parser.add_argument("--long-run", metavar="DIR",
+                        help="stream per-generation statistics and best genomes to files in DIR instead of keeping "
+                             "them in memory, and trim NEAT's own history, so memory stays flat (see longrun.py)")
+    parser.add_argument("--rotate-every", type=int, default=100, metavar="N",
+                        help="with --long-run, start new files every N generations (default 100)")
+    parser.add_argument("--keep-files", type=int, metavar="N",
+                        help="with --long-run, keep only the newest N files of each kind (default all)")
+    parser.add_argument("--save-winner", metavar="FILE",
+                        help="pickle the best genome to FILE at the end")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="time every phase of the tick loop and write the per-generation numbers to FILE (JSON)")
+    parser.add_argument("--profile-ticks", metavar="FILE",
+                        help="with --profile, also keep per-tick timings and write them to FILE (.npz)")
+    parser.add_argument("--stop", action="append", choices=sorted(STOP_CONDITIONS),
+                        help="end a generation early when this condition holds (can be repeated)")
+    parser.add_argument("--hunger-cap", type=int, metavar="N",
+                        help="hunger stops growing at N")
+    parser.add_argument("--starve-after", type=int, metavar="N",
+                        help="blobs die once their hunger goes past N")
+    parser.add_argument("--ticks", type=int, metavar="N",
+                        help="physics steps per generation (default: the world's, divided by --dt)")
+    parser.add_argument("--dt", type=float, metavar="DT",
+                        help="time per physics step; blobs move and turn DT times as far (default 1)")
+    parser.add_argument("--decide-every", type=int, metavar="N",
+                        help="activate the networks every N physics steps (default 1)")
+    parser.add_argument("--fitness", metavar="SPEC",
+                        help="fitness components instead of the world's own, e.g. food,coverage:0.2 "
+                             "(food, regions, out_of_bounds, coverage; :N sets the weight, "
+                             "coverage:N:PX also the cell size)")
+    parser.add_argument("--arenas", type=int, metavar="K",
+                        help="score every genome over K arenas with different food layouts (default 1)")
+    parser.add_argument("--respawn", choices=["immediate", "timed"],
+                        help="bring used up food back somewhere new, straight away or after --respawn-delay ticks")
+    parser.add_argument("--respawn-delay", type=int, metavar="N",
+                        help="ticks before used up food comes back")
+    parser.add_argument("--food-density", metavar="FILE",
+                        help="place food following the grid of weights in FILE (text, one row per line)")
+    parser.add_argument("--consume", action="store_true",
+                        help="the first blob to eat a food item uses it up for everyone")
+    args = parser.parse_args()
+    parallel = args.workers or args.distribute
+    if parallel and (args.render_every or args.render_generation or args.publish):
+        parser.error("rendering and publishing only work without --workers or --distribute")
+    if parallel and (args.record or args.heatmap):
+        parser.error("recording and heatmaps only work without --workers or --distribute")
+    if args.distribute and not args.distribute.rpartition(":")[2].isdigit():
+        parser.error("--distribute takes [HOST:]PORT")
+    if args.rotate_every < 1 or args.keep_files is not None and args.keep_files < 1:
+        parser.error("--rotate-every and --keep-files must be at least 1")
+    if args.cache and not parallel:
+        parser.error("--cache needs --workers or --distribute")
+    if args.task_timeout and not args.distribute:
+        parser.error("--task-timeout needs --distribute")
+    if args.publish and not args.publish.rpartition(":")[2].isdigit():
+        parser.error("--publish takes [HOST:]PORT")
+    if args.isolated and not parallel:
+        parser.error("--isolated needs --workers or --distribute")
+    if args.resume and args.seed is not None:
+        parser.error("--seed can't be used with --resume, the checkpoint has its own")
+    if args.respawn_delay and args.respawn == "immediate":
+        parser.error("--respawn immediate doesn't take a delay")
+    if args.profile_ticks and not args.profile:
+        parser.error("--profile-ticks needs --profile")
+    if args.profile_ticks and parallel:
+        parser.error("--profile-ticks only works without --workers or --distribute")
+    return args
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import struct
+
+import pygame
+
+from render import Renderer
+from snapshot import Frame
+
+
+# Live viewer for a training run started with --publish. Listens for the
+# SnapshotPublisher, keeps only the newest frame it got and draws at its own
+# frame rate, so a slow viewer just skips frames and training never waits
+# for it.
+#
+#   python viewer.py --port 8765
+#   python main.py --publish 8765
+
+
+class Viewer:
+    def __init__(self, fps=30):
+        self.fps = fps
+        self.frame = None
+        self.drawn = None
+        self.renderer = Renderer()
+        self.running = True
+
+    async def receive(self, reader, writer):
+        try:
+            while self.running:
+                size, = struct.unpack(">I", await reader.readexactly(4))
+                self.frame = await reader.readexactly(size)
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    async def draw(self):
+        while self.running:
+            frame = self.frame
+            if frame is not None and frame is not self.drawn:
+                self.drawn = frame
+                frame = Frame(frame)
+                if not self.renderer.is_open():
+                    self.renderer.on_init(frame)
+                else:
+                    self.renderer.on_render(frame)
+                pygame.display.set_caption("Generation {0}, tick {1}".format(frame.generation, frame.tick))
+            if self.renderer.is_open():
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.running = False
+            await asyncio.sleep(1.0 / self.fps)
+        self.renderer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.receive, host, port)
+        print("Waiting for snapshots on {0}:{1}".format(host, port))
+        async with server:
+            await self.draw()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a training run live.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(Viewer(args.fps).serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
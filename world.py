@@ -0,0 +1,510 @@
+import math
+import os
+import random
+import struct
+
+import neat
+import numpy as np
+
+from batchnet import BatchNetwork
+from bits import BitRows
+from fitness import Food, OutOfBounds, Regions
+from food import NoRespawn
+from sensors import parse_sensors
+from spatial import FoodGrid
+
+
+#GLOBAL VAR
+TOTAL_WIDTH = 1000
+TOTAL_HEIGHT = 1000
+
+LOCAL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Network inputs of a world that doesn't pick its own `sensors` (see
+# sensors.py for everything a blob can sense)
+SENSORS = ("num_food_seen", "hunger", "dist_food", "diff_angle", "nearest_wall", "region_in")
+# Outputs: forward, backward, left, right
+NUM_OUTPUTS = 4
+
+# Blobs only ever turn a whole degree at a time, so the heading comes from a
+# table built with math.cos/math.sin instead of calling them every tick
+COS_TABLE = np.array([math.cos(math.radians(a)) for a in range(360)])
+SIN_TABLE = np.array([math.sin(math.radians(a)) for a in range(360)])
+
+
+def png_size(path):
+    # Width and height straight from the PNG header, so headless runs don't
+    # need pygame (or a display) just to size the sprites
+    with open(path, "rb") as f:
+        header = f.read(24)
+    return struct.unpack(">II", header[16:24])
+
+
+class World:
+    # Headless simulation: the tick logic without a display. Anything that
+    # wants to look at the world (a Renderer, say) attaches as an observer and
+    # gets on_init/on_tick/on_cleanup callbacks.
+    #
+    # Blob state is kept as one NumPy array per attribute (index i is the
+    # blob of the i-th genome) and every phase of a tick works on all of
+    # them at once.
+    #
+    # arenas > 1 runs that many independent arenas side by side, each with
+    # its own food layout and its own blob for every genome. Blob row
+    # a * num_genomes + i is genome i in arena a, food id a * num_food + j is
+    # item j of arena a, and a genome's fitness is its mean over the arenas.
+    # Arena 0 is the world a single-arena run with the same seed would get.
+    #
+    # Optional rules: hunger_cap stops hunger growing past the cap, and
+    # starve_after kills a blob (it stops moving and eating) once its hunger
+    # goes past that. stop_conditions (see stopping.py) can end a run early
+    # once its outcome can't change.
+    #
+    # Time: every tick is one physics step of dt time units (the original
+    # tick is 1). Blobs move speed * dt and turn rotation_speed * dt degrees a
+    # step and hunger grows by dt, so a larger dt covers the same time in
+    # fewer ticks (ticks defaults to the class's ticks / dt). The nets only
+    # decide every decide_every steps and the blobs keep doing the same in
+    # between. A blob that moves more than a pixel a step eats any food its
+    # sprite sweeps over during the step, not just where it ends up.
+    #
+    # Fitness comes from fitness_components (see fitness.py), by default
+    # default_fitness().
+    #
+    # Food: food_policy (see food.py) places it and decides whether used up
+    # food comes back. Every blob can eat every item once, and an item is
+    # used up when all of them have; with consume_food the first blob to
+    # touch an item uses it up, so blobs compete for food.
+    ticks = 30000
+    check_every = 100
+    sensors = SENSORS
+
+    def __init__(self, seed=None, stop_conditions=(), hunger_cap=None, starve_after=None,
+                 food_policy=None, consume_food=False, arenas=1, dt=1, decide_every=1, ticks=None,
+                 fitness_components=None):
+        # Food placement draws from the world's own generator, so a seed
+        # reproduces the same layout in any process
+        self.rng = random.Random(seed)
+        self.width, self.height = TOTAL_WIDTH, TOTAL_HEIGHT
+        # The arena is split into a regions x regions grid (see get_region)
+        self.regions = 3
+        self.blob_size = png_size(os.path.join(LOCAL_DIR, "blob.png"))
+        self.food_size = png_size(os.path.join(LOCAL_DIR, "food.png"))
+        # Offset from a blob's centre to the top left corner of its sprite
+        self.blob_offset = (self.blob_size[0] // 2, self.blob_size[1] // 2)
+        self.food_list = []
+        self.num_food = 20
+        self.speed = 1
+        self.rotation_speed = 1
+        self.dt = dt
+        self.decide_every = decide_every
+        self.ticks = ticks if ticks is not None else int(round(self.ticks / dt))
+        self.vision_cone_angle = 60
+        self.vision_cone_distance = 200
+        self.genomes = None
+        self.config = None
+        self.nets = []
+        self.arenas = arenas
+        self.num_genomes = 0
+        self.num_blobs = 0
+        self.hunger_cap = hunger_cap
+        self.starve_after = starve_after
+        self.stop_conditions = list(stop_conditions)
+        self.fitness_components = (list(fitness_components) if fitness_components is not None
+                                   else self.default_fitness())
+        self.stopped_by = None
+        self.food_policy = food_policy if food_policy is not None else NoRespawn()
+        self.consume_food = consume_food
+        # Food never moves or comes back once placed
+        self.food_static = self.food_policy.static
+        self.tick = 0
+        self.observers = []
+
+    def attach(self, observer):
+        self.observers.append(observer)
+
+    def detach(self, observer):
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def default_fitness(self):
+        # +1 per food item, +1 per region visited, -5 for leaving the arena
+        return [Food(), Regions(), OutOfBounds(5)]
+
+    @property
+    def scores_movement(self):
+        # Fitness depends on where blobs go, not only on what they eat
+        return any(component.scores_movement for component in self.fitness_components)
+
+    @property
+    def interacting(self):
+        # Blobs affect each other, so they have to share one world: they
+        # compete for food, food that every blob has eaten comes back
+        # somewhere new (drawn from the world's generator), or they sense
+        # each other
+        return (self.consume_food or not self.food_policy.static or
+                any(sensor.interacting for sensor in parse_sensors(self.sensors)))
+
+    def on_init(self):
+        self.food_policy.on_init(self)
+        self.init_food()
+        self.init_blobs()
+        for observer in self.observers[:]:
+            observer.on_init(self)
+
+    def init_food(self):
+        self.food_list = [self.food_policy.place(self) for _ in range(self.arenas * self.num_food)]
+        self.food_active = np.ones(len(self.food_list), dtype=bool)
+        self.food_x = np.array([food[0] for food in self.food_list], dtype=float)
+        self.food_y = np.array([food[1] for food in self.food_list], dtype=float)
+        # Vision is the longest reach a blob has, so one lookup in a grid of
+        # vision-sized cells covers both vision and collisions
+        self.food_grid = FoodGrid(self.width, self.height, self.vision_cone_distance, layers=self.arenas)
+        for food_id, (food_x, food_y) in enumerate(self.food_list):
+            self.food_grid.insert(food_id, food_x, food_y, food_id // self.num_food)
+
+    def init_blobs(self):
+        self.nets = []
+        for genome_id, genome in self.genomes:
+            self.nets.append(neat.nn.FeedForwardNetwork.create(genome, self.config))
+            genome.fitness = 0
+        # Compiled once per generation, then the whole population's nets run
+        # in one call per tick
+        self.batch_net = BatchNetwork(self.nets * self.arenas)
+
+        self.num_genomes = len(self.nets)
+        n = self.num_blobs = self.num_genomes * self.arenas
+        self.blob_arena = np.repeat(np.arange(self.arenas), self.num_genomes)
+        self.x = np.full(n, self.width / 2)
+        self.y = np.full(n, self.height / 2)
+        self.angle = np.zeros(n)
+        self.cos = np.full(n, COS_TABLE[0])
+        self.sin = np.full(n, SIN_TABLE[0])
+        self.num_food_seen = np.zeros(n)
+        self.dist_food = np.full(n, 1000.0)
+        self.diff_angle = np.full(n, 180.0)
+        self.hunger = np.zeros(n)
+        self.nearest_wall = np.full(n, 500.0)
+        self.region_in = np.full(n, 5.0)
+        self.fitness = np.zeros(n)
+        self.alive = np.ones(n, dtype=bool)
+        # (blob, food) pairs in reach as of the last vision step, for the
+        # sensors that look at food
+        self.reach_blob = self.reach_food = np.zeros(0, dtype=int)
+        self.active_sensors = parse_sensors(self.sensors)
+        for sensor in self.active_sensors:
+            sensor.on_init(self)
+        # What each blob did this tick, for the stop conditions
+        self.inputs = self.blob_inputs()
+        self.still = np.ones(n, dtype=bool)
+        self.turned = np.zeros(n, dtype=bool)
+        self.direction = np.zeros(n)
+        self.ate = np.zeros(n, dtype=bool)
+        self.step = self.speed * self.dt
+        self.turn = self.rotation_speed * self.dt
+        if self.step + max(self.blob_size) + max(self.food_size) > self.vision_cone_distance:
+            raise ValueError("a step of {0} px is too long for the food lookup".format(self.step))
+        self.swept = self.step > 1
+        self.half_cone_cos = math.cos(math.radians(self.vision_cone_angle / 2))
+        self.prev_x = self.x.copy()
+        self.prev_y = self.y.copy()
+        for component in self.fitness_components:
+            component.on_init(self)
+        self.output = np.zeros((n, self.batch_net.num_outputs))
+        self.eaten_blob = self.eaten_food = np.zeros(0, dtype=int)
+        # food_eaten bit (i, j): blob i already ate item j of its arena (each
+        # blob can eat every food item once)
+        self.food_eaten = BitRows(n, self.num_food)
+        # Region (see get_region) every blob is in this step, only worked
+        # out when a fitness component or sensor reads it
+        self.region = np.full(n, -1)
+        self.tracks_region = (any(component.uses_region for component in self.fitness_components) or
+                              any(sensor.uses_region for sensor in self.active_sensors))
+
+    def blob_inputs(self):
+        return np.column_stack([sensor.sense(self) for sensor in self.active_sensors])
+
+    def activate(self):
+        self.inputs = self.blob_inputs()
+        return self.batch_net.activate(self.inputs)
+
+    def move(self, output):
+        # Columns of output are [forward, backward, left, right]
+        forward, backward, left, right = (output > 0.5).T & self.alive
+
+        turned = self.turned = left != right
+        if turned.any():
+            self.angle += left * self.turn
+            self.angle -= right * self.turn
+            # Keep angle between 0 and 360
+            self.angle %= 360
+            if float(self.turn).is_integer():
+                heading = self.angle[turned].astype(int)
+                self.cos[turned] = COS_TABLE[heading]
+                self.sin[turned] = SIN_TABLE[heading]
+            else:
+                heading = np.radians(self.angle[turned])
+                self.cos[turned] = np.cos(heading)
+                self.sin[turned] = np.sin(heading)
+
+        # Applied one after the other like the scalar version, so forward and
+        # backward together round the same way
+        self.still = ~(turned | forward | backward)
+        self.direction = forward.astype(float) - backward
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+        self.x += forward * (self.step * self.cos)
+        self.y -= forward * (self.step * self.sin)
+        self.x -= backward * (self.step * self.cos)
+        self.y += backward * (self.step * self.sin)
+
+    def find_food_nearby(self):
+        # Candidate (blob, food) pairs for this tick's vision and collisions
+        self.near_blob, self.near_food = self.food_grid.query(self.x, self.y, self.blob_arena)
+
+    def update_vision(self):
+        # The cone test works on the heading vector (cos, -sin) of each blob:
+        # with d the vector to the food, dot = |d| cos(a) and cross =
+        # |d| sin(a) for a the angle from the heading to the food, so food is
+        # in the cone when dot > |d| cos(half cone), compared squared. Only
+        # the closest food of each blob needs a sqrt and an atan2, and the
+        # angle it gets is already wrapped to (-180, 180].
+        blob, food = self.near_blob, self.near_food
+        to_food_x = self.food_x[food] - self.x[blob]
+        to_food_y = self.food_y[food] - self.y[blob]
+        distance_sq = to_food_x * to_food_x + to_food_y * to_food_y
+
+        # Eaten bits are only looked up for the pairs still in reach
+        near = (distance_sq <= self.vision_cone_distance ** 2).nonzero()[0]
+        near = near[~self.food_eaten.get(blob[near], food[near] % self.num_food)]
+        blob, food, distance_sq = blob[near], food[near], distance_sq[near]
+        self.reach_blob, self.reach_food = blob, food
+        to_food_x, to_food_y = to_food_x[near], to_food_y[near]
+        cos, sin = self.cos[blob], self.sin[blob]
+        dot = cos * to_food_x - sin * to_food_y
+        half_cos = self.half_cone_cos
+        if half_cos >= 0:
+            seen = (dot > 0) & (dot * dot > half_cos * half_cos * distance_sq)
+        else:
+            seen = (dot > 0) | (dot * dot < half_cos * half_cos * distance_sq)
+        blob, food, distance_sq, dot = blob[seen], food[seen], distance_sq[seen], dot[seen]
+
+        self.num_food_seen = np.bincount(blob, minlength=self.num_blobs).astype(float)
+        self.dist_food = np.full(self.num_blobs, 1000.0)
+        self.diff_angle = np.full(self.num_blobs, 180.0)
+        if len(blob):
+            # Closest food in the cone per blob, lowest food id on ties like
+            # the strict < in the old loop
+            order = np.lexsort((food, distance_sq, blob))
+            first = order[np.r_[True, blob[order][1:] != blob[order][:-1]]]
+            first_blob = blob[first]
+            closest = seen.nonzero()[0][first]
+            cross = sin[closest] * to_food_x[closest] + cos[closest] * to_food_y[closest]
+            self.dist_food[first_blob] = np.sqrt(distance_sq[first])
+            self.diff_angle[first_blob] = np.degrees(np.arctan2(cross, dot[first]))
+
+    def get_hungry(self):
+        self.hunger += self.dt
+        if self.hunger_cap is not None:
+            np.minimum(self.hunger, self.hunger_cap, out=self.hunger)
+
+    def get_region(self):
+        # Region of the regions x regions grid (0-8 for 3x3), -1 when
+        # outside. region_in keeps the last region the blob was inside
+        inside = (self.x >= 0) & (self.x <= self.width) & (self.y >= 0) & (self.y <= self.height)
+
+        region_width = self.width // self.regions
+        region_height = self.height // self.regions
+
+        col = self.x[inside] // region_width
+        row = self.y[inside] // region_height
+        self.region_in[inside] = row * self.regions + col
+        region = np.full(self.num_blobs, -1)
+        region[inside] = row * self.regions + col
+        return region
+
+    def get_cell(self, cell_size=50):
+        # Index of the (row, col) grid cell, rows * cols when outside
+        rows = -(-self.height // cell_size)
+        cols = -(-self.width // cell_size)
+        inside = (self.x >= 0) & (self.x < self.width) & (self.y >= 0) & (self.y < self.height)
+        cell = np.full(self.num_blobs, rows * cols)
+        cell[inside] = (self.y[inside] // cell_size) * cols + self.x[inside] // cell_size
+        return cell
+
+    def distance_to_nearest_wall(self):
+        self.nearest_wall = np.minimum(np.minimum(self.x, self.y),
+                                       np.minimum(self.width - self.x, self.height - self.y))
+
+    def check_collision(self):
+        # Same overlap test pygame.Rect.colliderect does, without building
+        # the rects (pygame truncates the float corner towards zero)
+        blob, food = self.near_blob, self.near_food
+        blob_w, blob_h = self.blob_size
+        food_w, food_h = self.food_size
+        food_x = self.food_x[food]
+        food_y = self.food_y[food]
+        if self.swept:
+            touching = self.swept_touching(blob, food_x, food_y)
+        else:
+            blob_left = np.trunc(self.x[blob] - self.blob_offset[0])
+            blob_top = np.trunc(self.y[blob] - self.blob_offset[1])
+            touching = ((blob_left < food_x + food_w) & (food_x < blob_left + blob_w) &
+                        (blob_top < food_y + food_h) & (food_y < blob_top + blob_h))
+        blob, food = blob[touching], food[touching]
+        eaten = ~self.food_eaten.get(blob, food % self.num_food) & self.alive[blob]
+        blob, food = blob[eaten], food[eaten]
+        if self.consume_food and len(food):
+            # The first blob to touch an item uses it up, so every item is
+            # eaten once (by the lowest blob index, like the one-blob-at-a-
+            # time loop did)
+            order = np.argsort(blob, kind="stable")
+            first = order[np.unique(food[order], return_index=True)[1]]
+            blob, food = blob[first], food[first]
+        self.food_eaten.set(blob, food % self.num_food)
+        # Who ate what this tick, for anything recording the run
+        self.eaten_blob, self.eaten_food = blob, food
+        if len(food):
+            food = np.unique(food)
+            if not self.consume_food:
+                food = food[self.used_by_all(food)]
+            self.food_policy.used_up(self, food.tolist())
+        return np.bincount(blob, minlength=self.num_blobs)
+
+    def swept_touching(self, blob, food_x, food_y):
+        # The blob's sprite moving from its last position to this one
+        # overlaps the food at some point of the step. Along each axis the
+        # overlap holds for an open interval of the step fraction t; the
+        # sprite touches the food if the two intervals meet inside [0, 1]
+        blob_w, blob_h = self.blob_size
+        food_w, food_h = self.food_size
+        enter = np.full(len(blob), -np.inf)
+        leave = np.full(len(blob), np.inf)
+        for start, end, low, high in (
+                (self.prev_x[blob] - self.blob_offset[0], self.x[blob] - self.blob_offset[0],
+                 food_x - blob_w, food_x + food_w),
+                (self.prev_y[blob] - self.blob_offset[1], self.y[blob] - self.blob_offset[1],
+                 food_y - blob_h, food_y + food_h)):
+            distance = end - start
+            moving = distance != 0
+            inside = (low < start) & (start < high)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                first = (low - start) / distance
+                second = (high - start) / distance
+            # Not moving along this axis: always overlapping or never
+            enter = np.maximum(enter, np.where(moving, np.minimum(first, second),
+                                               np.where(inside, -np.inf, np.inf)))
+            leave = np.minimum(leave, np.where(moving, np.maximum(first, second),
+                                               np.where(inside, np.inf, -np.inf)))
+        return (enter < leave) & (enter < 1) & (leave > 0)
+
+    def arena_blobs(self, arena):
+        return slice(arena * self.num_genomes, (arena + 1) * self.num_genomes)
+
+    def used_by_all(self, food):
+        # Per food id: every blob of its arena has eaten it
+        arena = food // self.num_food
+        used = np.zeros(len(food), dtype=bool)
+        for a in np.unique(arena).tolist():
+            mine = arena == a
+            used[mine] = self.food_eaten.column_all(food[mine] % self.num_food, self.arena_blobs(a))
+        return used
+
+    def track(self):
+        if self.tracks_region:
+            self.region = self.get_region()
+        for component in self.fitness_components:
+            component.on_tick(self)
+
+    def on_eat(self, eaters, count):
+        self.hunger[eaters] = 0
+        for component in self.fitness_components:
+            component.on_eat(self, eaters, count)
+
+    def deciding(self, tick):
+        return tick % self.decide_every == 0
+
+    def on_loop(self):
+        if self.deciding(self.tick):
+            self.output = self.activate()
+            self.ate = np.zeros(self.num_blobs, dtype=bool)
+        self.move(self.output)
+        self.find_food_nearby()
+        # Only the nets read what the blobs see
+        if self.deciding(self.tick + 1):
+            self.update_vision()
+        self.get_hungry()
+        self.track()
+        count = self.check_collision()
+        eaters = count.nonzero()[0]
+        self.ate[eaters] = True
+        if len(eaters):
+            self.on_eat(eaters, count[eaters])
+        if self.starve_after is not None:
+            self.alive &= self.hunger <= self.starve_after
+        self.food_policy.on_tick(self)
+
+    def reset_food(self):
+        food_w, food_h = self.food_size
+        food_x = self.rng.randint(0, self.width - food_w)
+        food_y = self.rng.randint(0, self.height - food_h)
+        return (food_x, food_y)
+
+    def remove_food(self, food_id):
+        # Take a food item out of play until it respawns
+        self.food_grid.remove(food_id)
+        self.food_active[food_id] = False
+
+    def respawn_food(self, food_id, position=None):
+        # Put a food item somewhere new; nobody has eaten it there yet
+        if position is None:
+            position = self.food_policy.place(self)
+        food_x, food_y = self.food_list[food_id] = position
+        self.food_x[food_id] = food_x
+        self.food_y[food_id] = food_y
+        arena = food_id // self.num_food
+        self.food_eaten.clear_column(food_id % self.num_food, self.arena_blobs(arena))
+        if self.food_active[food_id]:
+            self.food_grid.move(food_id, food_x, food_y)
+        else:
+            self.food_grid.insert(food_id, food_x, food_y, arena)
+            self.food_active[food_id] = True
+
+    def score(self):
+        for component in self.fitness_components:
+            component.on_end(self)
+
+    def on_cleanup(self):
+        self.score()
+        fitness = self.fitness.reshape(self.arenas, self.num_genomes).mean(axis=0)
+        for (genome_id, genome), fitness in zip(self.genomes, fitness.tolist()):
+            genome.fitness = fitness
+        for observer in self.observers[:]:
+            observer.on_cleanup(self)
+
+    def on_execute(self, genomes, config):
+        self.genomes = genomes
+        self.config = config
+        self.on_init()
+
+        self.tick = 0
+        while self.tick < self.ticks:
+            self.on_loop()
+            self.tick += 1
+            for observer in self.observers[:]:
+                observer.on_tick(self)
+            if (self.stop_conditions and self.tick % self.check_every == 0 and self.deciding(self.tick) and
+                    self.should_stop()):
+                break
+        self.on_cleanup()
+
+    def should_stop(self):
+        for condition in self.stop_conditions:
+            if condition.check(self):
+                self.stopped_by = condition
+                return True
+        return False